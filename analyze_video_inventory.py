@@ -13,20 +13,77 @@ Date: 2025-01-06
 
 import csv
 import os
+import re
+import sys
 from pathlib import Path
 from collections import defaultdict, Counter
+from itertools import islice
+
+# Optional: PyArrow's multithreaded C++ CSV parser for large inventories
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa_csv = None
+
+# Optional: pyahocorasick finds every FileID in every filename in one pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional: RapidFuzz enables near-miss (typo / truncated ID) matching
+try:
+    from rapidfuzz import fuzz, process as fuzzy_process
+except ImportError:
+    fuzzy_process = None
+
+FUZZY_SCORE_CUTOFF = 90
+
+# Google Drive file IDs: 25+ characters from the URL-safe base64 alphabet
+GOOGLE_DRIVE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{25,}')
 
 
 def load_csv_data(csv_file: str):
     """Load FileIDs and categories from CSV."""
     data = []
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
+        table = None
+        if pa_csv is not None:
+            try:
+                table = pa_csv.read_csv(
+                    csv_file,
+                    parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                    convert_options=pa_csv.ConvertOptions(
+                        include_columns=['Category', 'FileID'],
+                        column_types={'Category': pa.string(), 'FileID': pa.string()},
+                        strings_can_be_null=False
+                    )
+                )
+            except pa.ArrowInvalid:
+                # e.g. ragged rows, which csv.reader accepts; load them the same way
+                table = None
+        
+        if table is not None:
+            data = [
+                {'category': sys.intern(category.strip()), 'file_id': file_id.strip()}
+                for category, file_id in zip(table.column('Category').to_pylist(),
+                                             table.column('FileID').to_pylist())
+            ]
+            return data
+        
+        with open(csv_file, 'r', encoding='utf-8', newline='', buffering=8 << 20) as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            category_index = header.index('Category')
+            file_id_index = header.index('FileID')
+            # Categories repeat on most rows, so intern them to share one string each
             for row in reader:
+                if not row:  # Skip blank lines
+                    continue
                 data.append({
-                    'category': row['Category'].strip(),
-                    'file_id': row['FileID'].strip()
+                    'category': sys.intern(row[category_index].strip()),
+                    'file_id': row[file_id_index].strip()
                 })
     except Exception as e:
         print(f"❌ Error reading CSV: {e}")
@@ -37,16 +94,59 @@ def load_csv_data(csv_file: str):
 
 def find_video_files(directory: str):
     """Find all video files in directory."""
-    video_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.m4v', '.webm', '.flv']
-    video_files = []
+    video_extensions = {'.mp4', '.mov', '.avi', '.mkv', '.m4v', '.webm', '.flv'}
     
-    directory_path = Path(directory)
+    # One directory listing; DirEntry caches its type so is_file() needs no extra stat
+    with os.scandir(directory) as entries:
+        return [
+            entry.path for entry in entries
+            if entry.is_file()
+            and os.path.splitext(entry.name)[1].lower() in video_extensions
+        ]
+
+
+def build_trigram_index(names):
+    """Map every 3-character substring to the (ordered) indices of names containing it."""
+    index = defaultdict(list)
+    for i, name in enumerate(names):
+        for trigram in {name[j:j + 3] for j in range(len(name) - 2)}:
+            index[trigram].append(i)
+    return index
+
+
+def find_containing_name(file_id, names, trigram_index):
+    """Return the first name containing file_id, probing only trigram candidates."""
+    if len(file_id) < 3:
+        return next((name for name in names if file_id in name), None)
     
-    for ext in video_extensions:
-        video_files.extend(directory_path.glob(f"*{ext}"))
-        video_files.extend(directory_path.glob(f"*{ext.upper()}"))
+    # Every name containing file_id must contain all of its trigrams, so the
+    # rarest trigram's posting list bounds the candidates we need to check
+    candidates = None
+    for j in range(len(file_id) - 2):
+        postings = trigram_index.get(file_id[j:j + 3])
+        if not postings:
+            return None
+        if candidates is None or len(postings) < len(candidates):
+            candidates = postings
     
-    return [str(f) for f in video_files]
+    for i in candidates:
+        if file_id in names[i]:
+            return names[i]
+    return None
+
+
+def find_containing_names(file_ids, names):
+    """Map each FileID to the first name containing it, using one Aho-Corasick scan."""
+    automaton = ahocorasick.Automaton()
+    for file_id in file_ids:
+        automaton.add_word(file_id, file_id)
+    automaton.make_automaton()
+    
+    found = {}
+    for name in names:
+        for _, file_id in automaton.iter(name):
+            found.setdefault(file_id, name)
+    return found
 
 
 def analyze_matching(csv_data, video_files):
@@ -57,7 +157,44 @@ def analyze_matching(csv_data, video_files):
     
     # Extract just filenames from full paths
     video_filenames = [Path(f).name for f in video_files]
-    video_stems = [Path(f).stem for f in video_files]  # Without extension
+    
+    # Build lookup indexes once instead of scanning every file per FileID
+    stem_to_file = {}
+    for filename in video_filenames:
+        stem_to_file.setdefault(Path(filename).stem, filename)
+    
+    # Resolve each distinct FileID once as a batch, then map back onto rows
+    file_ids = {item['file_id'] for item in csv_data}
+    
+    # Strategy 1: Exact stem match (without extension), one set intersection
+    resolved = {
+        file_id: (stem_to_file[file_id], "exact_stem")
+        for file_id in file_ids & stem_to_file.keys()
+    }
+    
+    # Strategy 2: FileID contained anywhere in the filename
+    remaining_ids = file_ids - resolved.keys()
+    if ahocorasick is not None and remaining_ids:
+        for file_id, matched_file in find_containing_names(remaining_ids, video_filenames).items():
+            resolved[file_id] = (matched_file, "filename_contains")
+    elif remaining_ids:
+        trigram_index = build_trigram_index(video_filenames)
+        for file_id in remaining_ids:
+            matched_file = find_containing_name(file_id, video_filenames, trigram_index)
+            if matched_file is not None:
+                resolved[file_id] = (matched_file, "filename_contains")
+    
+    # Strategy 3: Fuzzy stem match for anything still unresolved. There is
+    # deliberately no pure-Python fallback: an edit-distance loop over every
+    # (FileID, stem) pair is quadratic in the interpreter, so without
+    # rapidfuzz we simply report these as unmatched
+    if fuzzy_process is not None:
+        video_stems = list(stem_to_file)
+        for file_id in file_ids - resolved.keys():
+            best = fuzzy_process.extractOne(file_id, video_stems, scorer=fuzz.ratio,
+                                            score_cutoff=FUZZY_SCORE_CUTOFF)
+            if best is not None:
+                resolved[file_id] = (stem_to_file[best[0]], "fuzzy_stem")
     
     matched = []
     unmatched = []
@@ -65,44 +202,14 @@ def analyze_matching(csv_data, video_files):
     for item in csv_data:
         file_id = item['file_id']
         category = item['category']
+        match = resolved.get(file_id)
         
-        # Try different matching strategies
-        found = False
-        match_type = ""
-        matched_file = ""
-        
-        # Strategy 1: Exact filename match (with extension)
-        for video_file in video_filenames:
-            if file_id in video_file:
-                found = True
-                match_type = "filename_contains"
-                matched_file = video_file
-                break
-        
-        # Strategy 2: Exact stem match (without extension)
-        if not found:
-            for i, stem in enumerate(video_stems):
-                if file_id == stem:
-                    found = True
-                    match_type = "exact_stem"
-                    matched_file = video_filenames[i]
-                    break
-        
-        # Strategy 3: FileID contained in stem
-        if not found:
-            for i, stem in enumerate(video_stems):
-                if file_id in stem:
-                    found = True
-                    match_type = "stem_contains"
-                    matched_file = video_filenames[i]
-                    break
-        
-        if found:
+        if match is not None:
             matched.append({
                 'file_id': file_id,
                 'category': category,
-                'matched_file': matched_file,
-                'match_type': match_type
+                'matched_file': match[0],
+                'match_type': match[1]
             })
         else:
             unmatched.append({
@@ -145,7 +252,7 @@ def print_analysis_results(csv_data, video_files, matched, unmatched):
     # Show sample matches
     if matched:
         print(f"\n✅ SAMPLE SUCCESSFUL MATCHES:")
-        for item in matched[:10]:
+        for item in islice(matched, 10):
             print(f"   {item['file_id']} -> {item['matched_file']} ({item['match_type']})")
         if len(matched) > 10:
             print(f"   ... and {len(matched) - 10} more")
@@ -153,14 +260,14 @@ def print_analysis_results(csv_data, video_files, matched, unmatched):
     # Show unmatched items
     if unmatched:
         print(f"\n❌ UNMATCHED ITEMS:")
-        for item in unmatched[:15]:
+        for item in islice(unmatched, 15):
             print(f"   {item['file_id']} ({item['category']})")
         if len(unmatched) > 15:
             print(f"   ... and {len(unmatched) - 15} more")
     
     # Show sample video files
     print(f"\n📁 SAMPLE VIDEO FILES FOUND:")
-    for video_file in video_files[:10]:
+    for video_file in islice(video_files, 10):
         filename = Path(video_file).name
         print(f"   {filename}")
     if len(video_files) > 10:
@@ -180,14 +287,16 @@ def suggest_improvements(matched, unmatched, video_files):
         print(f"   3. Consider renaming video files to match FileIDs exactly")
         
         # Analyze unmatched FileIDs for patterns
-        unmatched_ids = [item['file_id'] for item in unmatched]
-        if unmatched_ids:
+        sample_ids = [item['file_id'] for item in islice(unmatched, 5)]
+        if sample_ids:
             print(f"\n🔍 Unmatched FileID patterns:")
             # Check if they look like Google Drive IDs
-            google_drive_pattern = all(len(id) > 20 and '-' in id for id in unmatched_ids[:5])
+            google_drive_pattern = all(GOOGLE_DRIVE_ID_PATTERN.fullmatch(id) for id in sample_ids)
             if google_drive_pattern:
                 print(f"   - FileIDs look like Google Drive IDs")
                 print(f"   - You may need to download videos with these IDs as filenames")
+            if fuzzy_process is None:
+                print(f"   - Install rapidfuzz (pip install rapidfuzz) to also detect near-miss filenames")
     
     if len(matched) > 0:
         print(f"\n✅ Good news:")
@@ -13,17 +13,61 @@ Date: 2025-01-06
 """
 
 import csv
+import html
+import json
+import logging
 import os
+import sys
 import shutil
-import gdown
+import heapq
 import tempfile
+import threading
 import time
 import random
+import re
+import sqlite3
+from contextlib import closing, nullcontext
+from itertools import islice
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from typing import List, Dict, Optional, Tuple, Set
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ffmpeg_processor import convert_video_format
 
+# Optional: PyArrow's multithreaded C++ CSV parser for large inventories
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa_csv = None
+
+# Optional: a single progress bar with rate/ETA instead of per-video progress lines
+try:
+    from tqdm import tqdm
+    from tqdm.contrib.logging import logging_redirect_tqdm
+except ImportError:
+    tqdm = None
+
+# Per-video status lines go through this logger; raise its level (e.g. to
+# logging.WARNING) to keep only failures on long runs
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Google Drive file IDs: 25+ characters from the URL-safe base64 alphabet
+GOOGLE_DRIVE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{25,}')
+
+# Google Drive download endpoint
+DRIVE_DOWNLOAD_URL = "https://drive.google.com/uc"
+BROWSER_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
 
 class BatchVideoProcessor:
     """
@@ -41,7 +85,11 @@ class BatchVideoProcessor:
                  max_delay: float = 30.0,
                  batch_size: int = 50,
                  batch_pause_min: int = 10,
-                 batch_pause_max: int = 15):
+                 batch_pause_max: int = 15,
+                 show_download_progress: bool = False,
+                 ffmpeg_threads: Optional[int] = None,
+                 hwaccel: Optional[str] = None,
+                 random_seed: Optional[int] = None):
         """
         Initialize the batch processor with smart throttling for Google Drive downloads.
 
@@ -52,12 +100,21 @@ class BatchVideoProcessor:
             frame_height: Video height in pixels (default: 1920)
             frame_rate: Video frame rate (default: 29.97)
             bitrate: Video bitrate (default: "6M")
-            max_workers: Set to 1 for sequential processing (no parallel downloads)
+            max_workers: Number of parallel FFmpeg conversions (downloads always run one at a time)
             min_delay: Minimum delay between downloads in seconds (default: 5.0)
             max_delay: Maximum delay between downloads in seconds (default: 30.0)
             batch_size: Number of downloads before taking a batch pause (default: 50)
             batch_pause_min: Minimum batch pause in minutes (default: 10)
             batch_pause_max: Maximum batch pause in minutes (default: 15)
+            show_download_progress: Print a running MB counter for each download (default: False).
+                The counter redraws many times per second and interleaves with
+                status lines from parallel FFmpeg workers.
+            ffmpeg_threads: Threads per FFmpeg encode (default: CPU cores split
+                evenly across max_workers, so parallel encodes don't oversubscribe)
+            hwaccel: FFmpeg -hwaccel method for decoding, e.g. "cuda", "qsv",
+                "videotoolbox" or "auto" (default: None, software decoding)
+            random_seed: Seed for the delay and batch-pause randomization, for
+                reproducible reruns (default: None, seeded from the OS)
         """
         self.source_directory = Path(source_directory)
         self.destination_directory = Path(destination_directory)
@@ -69,8 +126,16 @@ class BatchVideoProcessor:
         self.batch_size = batch_size
         self.batch_pause_min = batch_pause_min
         self.batch_pause_max = batch_pause_max
+        self.show_download_progress = show_download_progress
         self.downloads_in_current_batch = 0
 
+        # Private generator for delays and pauses, so runs can be seeded
+        self._rng = random.Random(random_seed)
+
+        # Rate limiter state: earliest monotonic time the next download may start
+        self._next_download_at = 0.0
+        self._download_slot_lock = threading.Lock()
+
         # Track failed downloads to avoid retrying
         self.failed_downloads: Set[str] = set()
 
@@ -78,98 +143,252 @@ class BatchVideoProcessor:
         self.retry_attempts: Dict[str, int] = {}
         self.failure_backoff_minutes = [5, 10, 15, 20]  # Progressive wait times
 
-        # Create persistent gdown session for reuse across downloads
-        self.gdown_session = None
+        # Persistent HTTP session (connection pool) reused across downloads,
+        # with browser-like headers. One keep-alive pool per host, so
+        # drive.google.com and the usercontent hosts it redirects to each keep
+        # their connections. Retries are left to our own exponential backoff.
+        self.download_session = requests.Session()
+        self.download_session.headers.update({'User-Agent': BROWSER_USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=0))
+        self.download_session.mount("https://", adapter)
+
+        # Names of files in source_directory, scanned once and kept current as
+        # downloads land and temp files are removed (None until first needed)
+        self._source_names: Optional[Set[str]] = None
+
+        # Parsed CSV data keyed by (path, mtime, size) so repeated loads are free
+        self._video_data_cache: Optional[Tuple[Tuple[str, int, int], List[Dict[str, str]]]] = None
 
         # Video processing configuration
         self.video_config = {
             'frame_width': frame_width,
             'frame_height': frame_height,
             'frame_rate': frame_rate,
-            'bitrate': bitrate
+            'bitrate': bitrate,
+            'threads': ffmpeg_threads or max(1, (os.cpu_count() or 4) // max(1, max_workers)),
+            'hwaccel': hwaccel
         }
 
         # Create directories if they don't exist
         self.source_directory.mkdir(parents=True, exist_ok=True)
         self.destination_directory.mkdir(parents=True, exist_ok=True)
 
+        # Plain-string copies for building per-video paths with os.path.join
+        self._source_dir = str(self.source_directory)
+        self._destination_dir = str(self.destination_directory)
+
+        # During process_all_videos() finished temp downloads are renamed in
+        # here and deleted in bulk when the run ends; outside a batch run
+        # they are unlinked straight away
+        self.trash_directory = self.source_directory / ".trash"
+        self.trash_directory.mkdir(exist_ok=True)
+        self._batch_running = False
+
+        # SQLite manifest of processed FileIDs, so unchanged output folders aren't rescanned
+        self.manifest_path = self.destination_directory / ".manifest.db"
+        self._manifest_lock = threading.Lock()
+
+        # Retry counts and permanent download failures, kept in their own file
+        # so deleting it retries dead FileIDs without dropping the manifest
+        self._state_path = self.destination_directory / ".state.json"
+        self._state_lock = threading.Lock()
+
         print(f"📁 Download directory: {self.source_directory}")
         print(f"📁 Output directory: {self.destination_directory}")
-        print(f"🎬 Video config: {frame_width}x{frame_height}, {frame_rate}fps, {bitrate}")
+        print(f"🎬 Video config: {frame_width}x{frame_height}, {frame_rate}fps, {bitrate}, "
+              f"{self.video_config['threads']} FFmpeg threads" + (f", hwaccel={hwaccel}" if hwaccel else ""))
         print(f"⏱️  Smart throttling: {min_delay}-{max_delay}s delays, batch pause every {batch_size} downloads")
 
-    def initialize_gdown_session(self):
-        """Initialize a persistent gdown session by patching gdown's internal session."""
-        try:
-            import requests
-            import gdown
+        # Carry known-dead FileIDs and retry counts over from earlier runs
+        self.load_download_failures()
+
+    @staticmethod
+    def _parse_drive_confirmation(page: str, file_id: str) -> Tuple[Optional[str], Dict[str, str]]:
+        """
+        Extract the confirmed download URL from Drive's "can't scan for viruses" page.
 
-            # Create a persistent session
-            self.gdown_session = requests.Session()
+        Returns:
+            Tuple of (url, query_params); url is None if the page has no download form
+            (e.g. quota exceeded or the file is not shared publicly)
+        """
+        form = re.search(r'<form[^>]*id="download-form"[^>]*>(.*?)</form>', page, re.DOTALL)
+        if form:
+            action = re.search(r'action="([^"]+)"', form.group(0))
+            params = {}
+            for tag in re.findall(r'<input[^>]*type="hidden"[^>]*>', form.group(1)):
+                name = re.search(r'name="([^"]*)"', tag)
+                value = re.search(r'value="([^"]*)"', tag)
+                if name:
+                    params[html.unescape(name.group(1))] = html.unescape(value.group(1)) if value else ""
+            if action:
+                return html.unescape(action.group(1)), params
+
+        # Older interstitial: a confirm token embedded in a link on the page
+        token = re.search(r'confirm=([0-9A-Za-z_-]+)', page)
+        if token:
+            return DRIVE_DOWNLOAD_URL, {'export': 'download', 'id': file_id, 'confirm': token.group(1)}
+
+        return None, {}
+
+    def _download_drive_file(self, file_id: str, destination: Path) -> str:
+        """
+        Stream a public Google Drive file to destination over the pooled session.
 
-            # Set up session with appropriate headers to mimic browser behavior
-            self.gdown_session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            })
+        Bytes are written to "<destination>.part" and renamed into place once
+        complete. If an earlier attempt left a partial file, the download
+        resumes from its end with an HTTP Range request; a server that ignores
+        the range (200 instead of 206) simply restarts the file.
 
-            # Patch gdown to use our persistent session
-            # This replaces gdown's internal session creation with our persistent one
-            if hasattr(gdown, 'download'):
-                # Store original session creation method
-                self._original_requests_session = requests.Session
+        Raises:
+            Exception: If Drive does not serve the file (permission, quota or network errors)
+        """
+        session = self.download_session
+        part_path = destination.with_name(destination.name + ".part")
+        resume_from = part_path.stat().st_size if part_path.exists() else 0
+        headers = {'Range': f"bytes={resume_from}-"} if resume_from else {}
+
+        response = session.get(DRIVE_DOWNLOAD_URL, params={'export': 'download', 'id': file_id},
+                               headers=headers, stream=True, timeout=60)
+        if response.status_code == 416:
+            return self._finish_unsatisfiable_range(response, file_id, destination, part_path, resume_from)
+        response.raise_for_status()
+
+        if 'text/html' in response.headers.get('Content-Type', ''):
+            # Large files are served behind a virus-scan interstitial page
+            page = response.text
+            response.close()
+            confirm_url, params = self._parse_drive_confirmation(page, file_id)
+            if confirm_url is None:
+                raise RuntimeError("Cannot retrieve the public link of the file "
+                                   "(no download confirmation; quota exceeded or not shared)")
+            response = session.get(confirm_url, params=params, headers=headers,
+                                   stream=True, timeout=60)
+            if response.status_code == 416:
+                return self._finish_unsatisfiable_range(response, file_id, destination, part_path, resume_from)
+            response.raise_for_status()
+            if 'text/html' in response.headers.get('Content-Type', ''):
+                response.close()
+                raise RuntimeError("Cannot retrieve the public link of the file "
+                                   "(Drive returned a page instead of the video)")
+
+        if response.status_code == 206:
+            mode = 'ab'
+            logger.info(f"   ↪️  Resuming {file_id} from {resume_from / (1024 * 1024):.1f} MB")
+        else:
+            mode = 'wb'
+            resume_from = 0
+
+        with response, open(part_path, mode) as file:
+            if self.show_download_progress:
+                downloaded = resume_from
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    file.write(chunk)
+                    downloaded += len(chunk)
+                    print(f"   ⬇️  {file_id}: {downloaded / (1024 * 1024):.1f} MB", end='\r')
+                print()
+            else:
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, file, length=1 << 20)
 
-                # Replace requests.Session with our persistent session
-                def get_persistent_session(*args, **kwargs):
-                    return self.gdown_session
+        # Only a complete file ever appears under the temp download name
+        os.replace(part_path, destination)
 
-                # Monkey patch requests.Session for gdown
-                requests.Session = get_persistent_session
+        return str(destination)
 
-                print(f"🔗 Initialized persistent download session with session reuse")
-                return True
-            else:
-                print(f"⚠️  gdown not properly imported")
-                return False
+    def _finish_unsatisfiable_range(self, response: requests.Response, file_id: str, destination: Path,
+                                     part_path: Path, resume_from: int) -> str:
+        """
+        Resolve a 416 reply to a resume request.
 
-        except Exception as e:
-            print(f"⚠️  Could not initialize persistent session: {e}")
-            print(f"   Will use regular gdown downloads")
-            self.gdown_session = None
-            return False
+        Drive answers 416 when the Range starts at or past the end of the
+        file. If the partial file already holds every byte (Content-Range
+        "bytes */<size>" matches), it is simply renamed into place; otherwise
+        it doesn't fit the remote file, so it is deleted and the download
+        restarts from the beginning.
+
+        Returns:
+            Path of the downloaded file
+        """
+        content_range = response.headers.get('Content-Range', '')
+        response.close()
+        total_size = content_range.rpartition('/')[2]
+        if total_size.isdigit() and int(total_size) == resume_from:
+            os.replace(part_path, destination)
+            return str(destination)
+
+        logger.warning(f"   ⚠️  Partial download of {file_id} does not match the file on Drive, restarting")
+        part_path.unlink()
+        return self._download_drive_file(file_id, destination)
 
     def get_smart_delay(self) -> float:
         """Get a randomized delay between min_delay and max_delay seconds."""
-        delay = random.uniform(self.min_delay, self.max_delay)
+        delay = self._rng.uniform(self.min_delay, self.max_delay)
         return round(delay, 1)
 
+    def wait_for_download_slot(self):
+        """
+        Space download starts by a randomized smart delay.
+
+        The delay is measured from the previous download's start rather than
+        slept in full before every download, so time already spent downloading
+        (or waiting on FFmpeg) counts towards it. Thread-safe, so concurrent
+        callers share a single rate limit.
+        """
+        with self._download_slot_lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next_download_at - now)
+            delay = self.get_smart_delay()
+            self._next_download_at = now + wait + delay
+
+        if wait > 0:
+            logger.debug(f"⏱️  Smart delay: waiting {wait:.1f}s (randomized {self.min_delay}-{self.max_delay}s between downloads)...")
+            time.sleep(wait)
+
     def should_take_batch_pause(self) -> bool:
         """Check if we should take a batch pause."""
         return self.downloads_in_current_batch >= self.batch_size
 
+    @staticmethod
+    def _sleep_with_countdown(seconds: float, label: str, interval: float = 10.0):
+        """
+        Sleep for seconds, redrawing a countdown line every interval seconds.
+
+        When stdout is not a terminal (e.g. redirected to a log file) or the
+        logger is quieter than INFO, the countdown would only add noise, so
+        this is a single sleep.
+        """
+        if not sys.stdout.isatty() or not logger.isEnabledFor(logging.INFO):
+            time.sleep(seconds)
+            return
+
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            mins, secs = divmod(int(remaining + 0.5), 60)
+            print(f"   ⏳ {label} {mins:02d}:{secs:02d}...", end='\r', flush=True)
+            time.sleep(min(interval, remaining))
+        print()
+
     def take_batch_pause(self):
         """Take a batch pause to mimic natural usage patterns."""
         if self.downloads_in_current_batch == 0:
             return  # No downloads yet, no need to pause
 
-        pause_minutes = random.uniform(self.batch_pause_min, self.batch_pause_max)
+        pause_minutes = self._rng.uniform(self.batch_pause_min, self.batch_pause_max)
         pause_seconds = pause_minutes * 60
 
-        print(f"\n🛑 BATCH PAUSE ({self.downloads_in_current_batch} downloads completed)")
-        print(f"   Taking a {pause_minutes:.1f} minute break to mimic natural usage...")
-        print(f"   This helps avoid Google Drive rate limiting")
+        logger.info(f"\n🛑 BATCH PAUSE ({self.downloads_in_current_batch} downloads completed)")
+        logger.info(f"   Taking a {pause_minutes:.1f} minute break to mimic natural usage...")
+        logger.info(f"   This helps avoid Google Drive rate limiting")
 
         # Show countdown for long pauses
         if pause_seconds > 60:
-            remaining = int(pause_seconds)
-            while remaining > 0:
-                mins, secs = divmod(remaining, 60)
-                print(f"   ⏳ Resuming in {mins:02d}:{secs:02d}...", end='\r')
-                time.sleep(1)
-                remaining -= 1
-            print(f"   ✅ Break complete! Resuming downloads...")
+            self._sleep_with_countdown(pause_seconds, "Resuming in")
         else:
             time.sleep(pause_seconds)
-            print(f"   ✅ Break complete! Resuming downloads...")
+        logger.info(f"   ✅ Break complete! Resuming downloads...")
 
         # Reset batch counter
         self.downloads_in_current_batch = 0
@@ -185,62 +404,291 @@ class BatchVideoProcessor:
         self.retry_attempts[file_id] = self.retry_attempts.get(file_id, 0) + 1
         attempts = self.retry_attempts[file_id]
 
+        if attempts > len(self.failure_backoff_minutes):
+            self.failed_downloads.add(file_id)
+        self.save_download_state()
+
         if attempts <= len(self.failure_backoff_minutes):
             # Get wait time for this attempt
             wait_minutes = self.failure_backoff_minutes[attempts - 1]
             wait_seconds = wait_minutes * 60
 
-            print(f"\n⚠️  DOWNLOAD FAILURE #{attempts} for {file_id}")
-            print(f"   Taking {wait_minutes} minute backoff before retry...")
-            print(f"   This helps handle temporary rate limiting or network issues")
+            logger.warning(f"\n⚠️  DOWNLOAD FAILURE #{attempts} for {file_id}")
+            logger.warning(f"   Taking {wait_minutes} minute backoff before retry...")
+            logger.warning(f"   This helps handle temporary rate limiting or network issues")
 
             # Show countdown for the wait
-            remaining = int(wait_seconds)
-            while remaining > 0:
-                mins, secs = divmod(remaining, 60)
-                print(f"   ⏳ Retrying in {mins:02d}:{secs:02d}...", end='\r')
-                time.sleep(1)
-                remaining -= 1
-
-            print(f"   🔄 Backoff complete! Attempting retry #{attempts + 1}...")
+            self._sleep_with_countdown(wait_seconds, "Retrying in")
+
+            logger.info(f"   🔄 Backoff complete! Attempting retry #{attempts + 1}...")
             return True
         else:
             # Max retries reached
-            print(f"\n❌ PERMANENT FAILURE for {file_id}")
-            print(f"   Tried {attempts} times with progressive backoff")
-            print(f"   Adding to permanent failure list - will not retry again")
-            self.failed_downloads.add(file_id)
+            logger.error(f"\n❌ PERMANENT FAILURE for {file_id}")
+            logger.error(f"   Tried {attempts} times with progressive backoff")
+            logger.error(f"   Adding to permanent failure list - will not retry again")
             return False
     
     def load_video_data(self, csv_file: str) -> List[Dict[str, str]]:
         """
         Load video data from CSV file.
+
+        The parsed rows are cached until the file's mtime or size changes, so
+        repeated calls for the same file (e.g. check_existing_files() followed
+        by process_all_videos()) share a single parse.
+
+        Rows are deduplicated by FileID so each video is downloaded and encoded
+        once; every category a FileID appears under is kept in 'categories'.
         
         Args:
             csv_file: Path to CSV file with Category and FileID columns
             
         Returns:
-            List of dictionaries with video data
+            List of dictionaries with video data ('category' is the first
+            category seen, 'categories' lists all of them)
         """
+        try:
+            stat = os.stat(csv_file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"CSV file {csv_file} not found")
+
+        cache_key = (os.path.abspath(csv_file), stat.st_mtime_ns, stat.st_size)
+        if self._video_data_cache and self._video_data_cache[0] == cache_key:
+            return self._video_data_cache[1]
+
         video_data = []
         
         try:
-            with open(csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    video_data.append({
-                        'category': row['Category'].strip(),
-                        'file_id': row['FileID'].strip()
-                    })
+            table = None
+            if pa_csv is not None:
+                try:
+                    table = pa_csv.read_csv(
+                        csv_file,
+                        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                        convert_options=pa_csv.ConvertOptions(
+                            include_columns=['Category', 'FileID'],
+                            column_types={'Category': pa.string(), 'FileID': pa.string()},
+                            strings_can_be_null=False
+                        )
+                    )
+                except pa.ArrowInvalid:
+                    # e.g. ragged rows, which csv.reader accepts; load them the same way
+                    table = None
+
+            if table is not None:
+                video_data = [
+                    {'category': sys.intern(category.strip()), 'file_id': file_id.strip()}
+                    for category, file_id in zip(table.column('Category').to_pylist(),
+                                                 table.column('FileID').to_pylist())
+                ]
+            else:
+                video_data = self._read_video_csv(csv_file)
         
         except FileNotFoundError:
             raise FileNotFoundError(f"CSV file {csv_file} not found")
         except Exception as e:
             raise Exception(f"Error reading CSV file: {e}")
         
+        # Collapse repeated FileIDs, remembering every category they appear under
+        unique_videos = {}
+        for row in video_data:
+            entry = unique_videos.get(row['file_id'])
+            if entry is None:
+                row['categories'] = [row['category']]
+                unique_videos[row['file_id']] = row
+            elif row['category'] not in entry['categories']:
+                entry['categories'].append(row['category'])
+
+        duplicates = len(video_data) - len(unique_videos)
+        video_data = list(unique_videos.values())
+
         print(f"📋 Loaded {len(video_data)} video entries from {csv_file}")
+        if duplicates:
+            print(f"   ⚡ Skipped {duplicates} duplicate FileID rows (each video is processed once)")
+        self._video_data_cache = (cache_key, video_data)
         return video_data
 
+    @staticmethod
+    def _read_video_csv(csv_file: str) -> List[Dict[str, str]]:
+        """Parse the Category/FileID columns with the standard library csv module."""
+        video_data = []
+        with open(csv_file, 'r', encoding='utf-8', newline='', buffering=8 << 20) as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            category_index = header.index('Category')
+            file_id_index = header.index('FileID')
+            # Categories repeat on most rows, so intern them to share one string each
+            for row in reader:
+                if not row:  # Skip blank lines
+                    continue
+                video_data.append({
+                    'category': sys.intern(row[category_index].strip()),
+                    'file_id': row[file_id_index].strip()
+                })
+        return video_data
+
+    @staticmethod
+    def list_directory_names(directory: Path) -> Set[str]:
+        """Return the names of all files in a directory (empty set if it is missing)."""
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            return set()
+
+    def move_to_trash(self, source_path: str):
+        """
+        Move a finished temp download out of source_directory.
+
+        A same-filesystem rename is a single metadata update; the actual
+        unlinks happen together in empty_trash() once the run is over.
+        Outside process_all_videos() nothing empties the trash, so the file
+        is deleted directly instead.
+        """
+        if not self._batch_running:
+            os.remove(source_path)
+            if self._source_names is not None:
+                self._source_names.discard(os.path.basename(source_path))
+            return
+
+        name = os.path.basename(source_path)
+        os.replace(source_path, self.trash_directory / name)
+        if self._source_names is not None:
+            self._source_names.discard(name)
+
+    def empty_trash(self):
+        """Delete every temp download moved aside by move_to_trash() (or left by an interrupted run)."""
+        shutil.rmtree(self.trash_directory, ignore_errors=True)
+        self.trash_directory.mkdir(exist_ok=True)
+
+    def _connect_manifest(self) -> sqlite3.Connection:
+        """Open the processed-video manifest, creating its tables if needed."""
+        connection = sqlite3.connect(self.manifest_path)
+        # Keep the rollback journal in memory. The manifest lives in the output
+        # directory, and the default DELETE mode creates and removes a -journal
+        # file there on every write, bumping the directory mtime that
+        # load_processed_ids() compares and forcing a full rescan each run
+        connection.execute("PRAGMA journal_mode=MEMORY")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS done (file_id TEXT PRIMARY KEY, mtime REAL, size INTEGER)"
+        )
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        return connection
+
+    def _mark_manifest_synced(self, connection: sqlite3.Connection):
+        """Record the output directory's current mtime as matching the manifest."""
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('directory_mtime_ns', ?)",
+            (os.stat(self.destination_directory).st_mtime_ns,)
+        )
+
+    def load_download_failures(self):
+        """
+        Restore retry counts and permanent download failures from earlier runs.
+
+        Without this, a restart would walk the whole backoff schedule again
+        for FileIDs already known to be dead. Delete .state.json in the output
+        directory to retry them.
+        """
+        try:
+            state = json.loads(self._state_path.read_text()) if self._state_path.exists() else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Could not load download failures: {e}")
+            return
+
+        self.failed_downloads.update(state.get('failed', []))
+        self.retry_attempts.update(state.get('attempts', {}))
+
+        if self.retry_attempts or self.failed_downloads:
+            print(f"📋 Restored {len(self.retry_attempts)} download failures from earlier runs "
+                  f"({len(self.failed_downloads)} permanent)")
+
+    def save_download_state(self):
+        """Write retry counts and permanent failures to .state.json."""
+        with self._state_lock:
+            state = {'failed': sorted(self.failed_downloads), 'attempts': dict(self.retry_attempts)}
+            try:
+                # Rewritten in place rather than replaced, so the output
+                # directory's mtime (checked by the manifest) stays put
+                self._state_path.write_text(json.dumps(state))
+            except OSError as e:
+                logger.warning(f"⚠️  Could not save download failures: {e}")
+
+    def clear_download_failure(self, file_id: str):
+        """Forget earlier failures of a FileID that has now downloaded."""
+        if self.retry_attempts.pop(file_id, None) is not None:
+            self.save_download_state()
+
+    def load_processed_ids(self) -> Set[str]:
+        """
+        Return the FileIDs that already have a processed video.
+
+        The manifest is trusted while the output directory's mtime matches the
+        one recorded at the last sync (adding, deleting or renaming a file
+        changes it); otherwise the directory is rescanned and the manifest rebuilt.
+        A corrupt manifest is deleted and rebuilt from a rescan. A locked or
+        otherwise unusable one (e.g. another run holds it) is left alone and
+        the rescan alone is used, as it is if the rebuild fails too.
+        """
+        try:
+            return self._load_processed_ids_from_manifest()
+        except sqlite3.Error as e:
+            # OperationalError ("database is locked", ...) is a DatabaseError too,
+            # but says nothing about the file itself, so never delete on it
+            if not isinstance(e, sqlite3.DatabaseError) or isinstance(e, sqlite3.OperationalError):
+                logger.warning(f"⚠️  Manifest unavailable ({e}), rescanning the output folder")
+                return set(self._scan_processed_videos())
+            logger.warning(f"⚠️  Manifest corrupt ({e}), rebuilding it")
+
+        try:
+            self.manifest_path.unlink(missing_ok=True)
+            return self._load_processed_ids_from_manifest()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️  Could not rebuild manifest: {e}")
+            return set(self._scan_processed_videos())
+
+    def _scan_processed_videos(self) -> Dict[str, tuple]:
+        """Map the FileID of every .mp4 in the output directory to its (mtime, size)."""
+        processed = {}
+        with os.scandir(self.destination_directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.mp4') and entry.is_file():
+                    stat = entry.stat()
+                    processed[entry.name[:-len('.mp4')]] = (stat.st_mtime, stat.st_size)
+        return processed
+
+    def _load_processed_ids_from_manifest(self) -> Set[str]:
+        """Read processed FileIDs from the manifest, rebuilding it if the directory changed."""
+        with self._manifest_lock, closing(self._connect_manifest()) as connection, connection:
+            row = connection.execute(
+                "SELECT value FROM meta WHERE key = 'directory_mtime_ns'"
+            ).fetchone()
+            if row and row[0] == os.stat(self.destination_directory).st_mtime_ns:
+                return {file_id for (file_id,) in connection.execute("SELECT file_id FROM done")}
+
+            processed = self._scan_processed_videos()
+            connection.execute("DELETE FROM done")
+            connection.executemany(
+                "INSERT INTO done (file_id, mtime, size) VALUES (?, ?, ?)",
+                [(file_id, mtime, size) for file_id, (mtime, size) in processed.items()]
+            )
+            self._mark_manifest_synced(connection)
+            return set(processed)
+
+    def record_processed_video(self, file_id: str, output_path: str):
+        """Add a freshly processed video to the manifest."""
+        try:
+            stat = os.stat(output_path)
+            with self._manifest_lock, closing(self._connect_manifest()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO done (file_id, mtime, size) VALUES (?, ?, ?)",
+                    (file_id, stat.st_mtime, stat.st_size)
+                )
+                self._mark_manifest_synced(connection)
+        except (OSError, sqlite3.Error) as e:
+            # The next load_processed_ids() call rescans the folder anyway
+            logger.warning(f"⚠️  Could not update manifest for {file_id}: {e}")
+
     def check_existing_files(self, csv_file: str) -> Dict[str, any]:
         """
         Check which files already exist (processed videos and downloads).
@@ -251,7 +699,27 @@ class BatchVideoProcessor:
         Returns:
             Dictionary with existing file statistics
         """
-        video_data = self.load_video_data(csv_file)
+        return self.classify_videos(self.load_video_data(csv_file))
+
+    def classify_videos(self, video_data: List[Dict[str, str]]) -> Dict[str, any]:
+        """
+        Sort already-loaded video entries into processed / downloaded / to-download.
+
+        The download directory listing taken here is kept for
+        find_or_download_video(), so a run scans it only once.
+
+        Args:
+            video_data: Entries returned by load_video_data()
+
+        Returns:
+            Dictionary with existing file statistics
+        """
+        # Read the processed manifest and list the download directory once,
+        # then test membership in memory instead of stat()-ing per CSV row
+        processed_ids = self.load_processed_ids()
+        download_names = self.list_directory_names(self.source_directory)
+        self._source_names = download_names
+        download_suffixes = ('.mp4', '.mov', '_temp.mp4')
 
         existing_processed = []
         existing_downloads = []
@@ -261,26 +729,14 @@ class BatchVideoProcessor:
             file_id = data['file_id']
 
             # Check if processed video exists
-            output_path = self.destination_directory / f"{file_id}.mp4"
-            if output_path.exists():
+            if file_id in processed_ids:
                 existing_processed.append(file_id)
                 continue
 
             # Check if download exists
-            download_patterns = [
-                self.source_directory / f"{file_id}.mp4",
-                self.source_directory / f"{file_id}.mov",
-                self.source_directory / f"{file_id}_temp.mp4"
-            ]
-
-            found_download = False
-            for pattern in download_patterns:
-                if pattern.exists():
-                    existing_downloads.append(file_id)
-                    found_download = True
-                    break
-
-            if not found_download:
+            if any(f"{file_id}{suffix}" in download_names for suffix in download_suffixes):
+                existing_downloads.append(file_id)
+            else:
                 need_processing.append(file_id)
 
         return {
@@ -293,83 +749,76 @@ class BatchVideoProcessor:
             'need_processing_files': need_processing
         }
 
-    def download_video_from_drive(self, file_id: str) -> Optional[str]:
+    def download_video_from_drive(self, file_id: str) -> Tuple[Optional[str], bool]:
         """
         Download video from Google Drive using persistent session with delay and failure tracking.
 
+        Failed attempts are retried in a loop, with exponential backoff between
+        them, until the download succeeds or the backoff schedule is exhausted.
+
         Args:
             file_id: Google Drive FileID
 
         Returns:
-            Path to downloaded video file if successful, None otherwise
+            Tuple of (path, is_temp): the downloaded temp file and True if successful,
+            (None, False) otherwise
         """
         # Check if this FileID has already failed permanently
         if file_id in self.failed_downloads:
-            print(f"⏭️  Skipping {file_id} (permanently failed after retries)")
-            return None
+            logger.info(f"⏭️  Skipping {file_id} (permanently failed after retries)")
+            return None, False
 
-        try:
-            # Check if we need a batch pause
-            if self.should_take_batch_pause():
-                self.take_batch_pause()
+        # A malformed ID can never download; don't spend the backoff schedule on it
+        if not GOOGLE_DRIVE_ID_PATTERN.fullmatch(file_id):
+            logger.info(f"⏭️  Skipping {file_id} (not a valid Google Drive FileID)")
+            self.failed_downloads.add(file_id)
+            return None, False
 
-            # Add randomized delay before download to mimic natural usage
-            delay = self.get_smart_delay()
-            print(f"⏱️  Smart delay: {delay}s (randomized {self.min_delay}-{self.max_delay}s)...")
-            time.sleep(delay)
+        # Create temporary file for download
+        temp_file = self.source_directory / f"{file_id}_temp.mp4"
 
-            # Create temporary file for download
-            temp_file = self.source_directory / f"{file_id}_temp.mp4"
+        while True:
+            try:
+                # Check if we need a batch pause
+                if self.should_take_batch_pause():
+                    self.take_batch_pause()
 
-            # Construct Google Drive URL
-            drive_url = f"https://drive.google.com/uc?id={file_id}"
+                # Keep randomized spacing between downloads to mimic natural usage
+                self.wait_for_download_slot()
 
-            # Download using gdown with persistent session (via monkey patching)
-            if self.gdown_session:
-                print(f"📥 Downloading {file_id} (using persistent session)...")
-            else:
-                print(f"📥 Downloading {file_id}...")
+                # Download over the persistent, connection-pooled session
+                logger.info(f"📥 Downloading {file_id} (using persistent session)...")
 
-            # gdown will automatically use our persistent session due to monkey patching
-            output_path = gdown.download(drive_url, str(temp_file), quiet=False, use_cookies=True)
+                output_path = self._download_drive_file(file_id, temp_file)
+
+                if output_path and os.path.exists(output_path):
+                    logger.info(f"✅ Download successful: {file_id}")
+                    # Increment batch counter for successful downloads
+                    self.downloads_in_current_batch += 1
+                    self.clear_download_failure(file_id)
+                    return output_path, True
 
-            if output_path and os.path.exists(output_path):
-                print(f"✅ Download successful: {file_id}")
-                # Increment batch counter for successful downloads
-                self.downloads_in_current_batch += 1
-                return output_path
-            else:
-                print(f"❌ Download failed: {file_id} (no output file - likely rate limiting)")
                 # Treat as potential rate limiting - use exponential backoff
-                if self.should_retry_failed_download(file_id):
-                    should_retry = self.handle_download_failure(file_id)
-                    if should_retry:
-                        # Recursive retry
-                        return self.download_video_from_drive(file_id)
-                else:
-                    self.failed_downloads.add(file_id)
-                return None
+                logger.error(f"❌ Download failed: {file_id} (no output file - likely rate limiting)")
 
-        except Exception as e:
-            print(f"❌ Download failed for {file_id}: {e}")
-
-            # Treat ALL failures as potential rate limiting - use exponential backoff
-            error_str = str(e).lower()
-            if "permission" in error_str or "public link" in error_str or "cannot retrieve" in error_str:
-                print(f"🔒 Potential rate limiting (disguised as permission issue)")
-
-            # Use exponential backoff for ALL failures
-            if self.should_retry_failed_download(file_id):
-                should_retry = self.handle_download_failure(file_id)
-                if should_retry:
-                    # Recursive retry
-                    return self.download_video_from_drive(file_id)
-            else:
-                self.failed_downloads.add(file_id)
+            except Exception as e:
+                logger.error(f"❌ Download failed for {file_id}: {e}")
 
-            return None
+                # Treat ALL failures as potential rate limiting - use exponential backoff
+                error_str = str(e).lower()
+                if "permission" in error_str or "public link" in error_str or "cannot retrieve" in error_str:
+                    logger.warning(f"🔒 Potential rate limiting (disguised as permission issue)")
 
-    def find_or_download_video(self, file_id: str) -> Optional[str]:
+            # Use exponential backoff for ALL failures, then loop round for another attempt
+            if not self.should_retry_failed_download(file_id):
+                self.failed_downloads.add(file_id)
+                self.save_download_state()
+                temp_file.with_name(temp_file.name + ".part").unlink(missing_ok=True)
+                return None, False
+            if not self.handle_download_failure(file_id):
+                return None, False
+
+    def find_or_download_video(self, file_id: str) -> Tuple[Optional[str], bool]:
         """
         Find existing video file or download from Google Drive.
 
@@ -377,98 +826,167 @@ class BatchVideoProcessor:
             file_id: FileID to search for or download
 
         Returns:
-            Path to video file if found/downloaded, None otherwise
+            Tuple of (path, is_temp). is_temp is True for our own temporary
+            downloads (which are deleted after processing) and False for
+            user-provided files. path is None if nothing was found or downloaded.
         """
-        # First, check if file already exists locally (including temp files)
+        if self._source_names is None:
+            self._source_names = self.list_directory_names(self.source_directory)
+
+        # First, check if file already exists locally (including leftover temp files)
         local_patterns = [
-            self.source_directory / f"{file_id}.mp4",
-            self.source_directory / f"{file_id}.mov",
-            self.source_directory / f"{file_id}_temp.mp4"
+            (f"{file_id}.mp4", False),
+            (f"{file_id}.mov", False),
+            (f"{file_id}_temp.mp4", True)
         ]
 
-        for pattern in local_patterns:
-            if pattern.exists():
-                print(f"✅ Found local download: {pattern.name}")
-                return str(pattern)
+        for name, is_temp in local_patterns:
+            if name in self._source_names:
+                logger.info(f"✅ Found local download: {name}")
+                return os.path.join(self._source_dir, name), is_temp
 
         # If not found locally, try to download from Google Drive
-        print(f"📥 Need to download: {file_id}")
-        return self.download_video_from_drive(file_id)
+        logger.info(f"📥 Need to download: {file_id}")
+        source_path, is_temp = self.download_video_from_drive(file_id)
+        if source_path:
+            self._source_names.add(os.path.basename(source_path))
+        return source_path, is_temp
     
-    def process_single_video(self, video_data: Dict[str, str]) -> Tuple[bool, str, str]:
+    def fetch_source_video(self, video_data: Dict[str, str]) -> Tuple[Optional[Tuple[bool, str, str]], Optional[str], bool]:
         """
-        Process a single video sequentially: download → process → cleanup.
-        Complete entire workflow before returning.
+        Download stage: skip already-processed videos, otherwise find or download the source.
 
         Args:
             video_data: Dictionary with 'category' and 'file_id'
 
         Returns:
-            Tuple of (success, input_file, output_file)
+            Tuple of (final_result, source_path, is_temp). final_result is set when
+            there is nothing left to convert (already processed or download failed);
+            otherwise it is None and source_path points at the video to convert.
+            is_temp says whether source_path should be deleted after conversion.
         """
         file_id = video_data['file_id']
-        category = video_data['category']
-
-        print(f"🎬 Starting complete workflow for: {file_id}")
-
-        # Create output filename based on FileID
-        output_filename = f"{file_id}.mp4"
-        output_path = self.destination_directory / output_filename
+        output_path = os.path.join(self._destination_dir, file_id + ".mp4")
 
         # Check if processed video already exists
-        if output_path.exists():
-            print(f"✅ Already processed: {file_id} (skipping)")
-            return True, "already_exists", str(output_path)
+        if os.path.isfile(output_path):
+            logger.info(f"✅ Already processed: {file_id} (skipping)")
+            return (True, "already_exists", output_path), None, False
 
         # Step 1: Find or download source video
-        print(f"📥 Step 1: Finding or downloading video...")
-        source_path = self.find_or_download_video(file_id)
+        logger.info(f"📥 Step 1: Finding or downloading video...")
+        source_path, is_temp = self.find_or_download_video(file_id)
         if not source_path:
-            print(f"❌ Step 1 failed: Could not download {file_id}")
-            return False, f"FileID: {file_id}", f"Download/find failed"
-        print(f"✅ Step 1 complete: Video available")
+            logger.error(f"❌ Step 1 failed: Could not download {file_id}")
+            return (False, f"FileID: {file_id}", f"Download/find failed"), None, False
+        logger.info(f"✅ Step 1 complete: Video available")
+
+        return None, source_path, is_temp
+
+    def convert_source_video(self, file_id: str, source_path: str, is_temp: bool) -> Tuple[bool, str, str]:
+        """
+        Conversion stage: run FFmpeg on a downloaded video and clean up its temp file.
+
+        Args:
+            file_id: FileID of the video (used for the output filename)
+            source_path: Path to the source video returned by fetch_source_video
+            is_temp: Whether source_path is a temporary download to delete afterwards
+
+        Returns:
+            Tuple of (success, input_file, output_file)
+        """
+        output_path = os.path.join(self._destination_dir, file_id + ".mp4")
+
+        # The source is deliberately staged on disk rather than piped from the
+        # download into ffmpeg's stdin: phone/camera MP4s usually carry their
+        # moov atom at the end, which ffmpeg can only reach on a seekable input,
+        # and a failed stream could not be retried without restarting the
+        # encode. The freshly written file is still in the page cache, and
+        # process_all_videos() overlaps the next download with this encode.
+
+        # FFmpeg writes next to the final name and the file is renamed into
+        # place only on success, so a crash never leaves a truncated .mp4
+        # that later runs would count as processed
+        partial_output_path = output_path + ".tmp"
 
         # Step 2: Process video through FFmpeg
-        print(f"🔄 Step 2: Processing through FFmpeg...")
+        logger.info(f"🔄 Step 2: Processing {file_id} through FFmpeg...")
         try:
             result = convert_video_format(
                 input_file=source_path,
-                output_file=str(output_path),
+                output_file=partial_output_path,
                 **self.video_config
             )
+            if result:
+                os.replace(partial_output_path, output_path)
+            elif os.path.exists(partial_output_path):
+                os.remove(partial_output_path)
 
             # Step 3: Clean up temporary download file if it was downloaded
-            if "_temp.mp4" in source_path:
-                print(f"🧹 Step 3: Cleaning up temporary file...")
+            if is_temp:
+                logger.info(f"🧹 Step 3: Cleaning up temporary file...")
+                source_name = os.path.basename(source_path)
                 try:
-                    os.remove(source_path)
-                    print(f"✅ Step 3 complete: Cleaned up {Path(source_path).name}")
+                    self.move_to_trash(source_path)
+                    logger.info(f"✅ Step 3 complete: Cleaned up {source_name}")
                 except:
-                    print(f"⚠️  Step 3 warning: Could not clean up {Path(source_path).name}")
+                    logger.warning(f"⚠️  Step 3 warning: Could not clean up {source_name}")
             else:
-                print(f"ℹ️  Step 3: No cleanup needed (using existing file)")
+                logger.info(f"ℹ️  Step 3: No cleanup needed (using existing file)")
 
             if result:
-                print(f"✅ Step 2 complete: FFmpeg processing successful")
-                print(f"🎉 Complete workflow finished for: {file_id}")
-                return True, source_path, str(output_path)
+                self.record_processed_video(file_id, output_path)
+                logger.info(f"✅ Step 2 complete: FFmpeg processing successful")
+                logger.info(f"🎉 Complete workflow finished for: {file_id}")
+                return True, source_path, output_path
             else:
-                print(f"❌ Step 2 failed: FFmpeg conversion failed")
+                logger.error(f"❌ Step 2 failed: FFmpeg conversion failed")
                 return False, source_path, "FFmpeg conversion failed"
 
         except Exception as e:
-            # Clean up temp file on error too
-            if source_path and "_temp.mp4" in source_path and os.path.exists(source_path):
+            # Clean up temp file (and any partial output) on error too
+            if os.path.exists(partial_output_path):
                 try:
-                    os.remove(source_path)
+                    os.remove(partial_output_path)
+                except:
+                    pass
+            if is_temp and os.path.exists(source_path):
+                try:
+                    self.move_to_trash(source_path)
                 except:
                     pass
             return False, source_path, f"Processing error: {str(e)}"
+
+    def process_single_video(self, video_data: Dict[str, str]) -> Tuple[bool, str, str]:
+        """
+        Process a single video sequentially: download → process → cleanup.
+        Complete entire workflow before returning.
+
+        Args:
+            video_data: Dictionary with 'category' and 'file_id'
+
+        Returns:
+            Tuple of (success, input_file, output_file)
+        """
+        file_id = video_data['file_id']
+
+        logger.info(f"🎬 Starting complete workflow for: {file_id}")
+
+        result, source_path, is_temp = self.fetch_source_video(video_data)
+        if result is not None:
+            return result
+
+        return self.convert_source_video(file_id, source_path, is_temp)
     
     def process_all_videos(self, csv_file: str) -> Dict[str, any]:
         """
         Process all videos from CSV file.
 
+        Downloads run one at a time on the calling thread (so throttling and
+        batch pauses still apply), while FFmpeg conversions run on up to
+        max_workers worker threads. The next download therefore overlaps
+        with the previous video's encode.
+
         Args:
             csv_file: Path to CSV file
 
@@ -482,9 +1000,12 @@ class BatchVideoProcessor:
         print(f"Video config: {self.video_config}")
         print(f"Max workers: {self.max_workers}")
 
+        # Parse the CSV once; the status check below works on the loaded rows
+        video_data = self.load_video_data(csv_file)
+
         # Check existing files first
         print(f"\n🔍 CHECKING EXISTING FILES...")
-        existing_check = self.check_existing_files(csv_file)
+        existing_check = self.classify_videos(video_data)
 
         print(f"📊 FILE STATUS:")
         print(f"   Total videos: {existing_check['total']}")
@@ -498,96 +1019,134 @@ class BatchVideoProcessor:
         if existing_check['existing_downloads'] > 0:
             print(f"⚡ OPTIMIZATION: {existing_check['existing_downloads']} videos already downloaded (will reuse)")
 
-        # Load video data
-        video_data = self.load_video_data(csv_file)
-
-        # Initialize persistent gdown session for better performance
-        print(f"\n🔗 Setting up persistent download session...")
-        self.initialize_gdown_session()
-
-        # Process videos sequentially (no parallel processing)
-        successful = []
-        failed = []
-
-        print(f"\n🚀 Starting sequential processing with smart throttling...")
-        print(f"   Processing {len(video_data)} videos one at a time")
-        print(f"   Each video: Download → Process → Cleanup → Next video")
-        print(f"   Using persistent session + randomized delays + batch pauses")
-        print(f"   Throttling: {self.min_delay}-{self.max_delay}s delays, pause every {self.batch_size} downloads")
-
-        for i, data in enumerate(video_data, 1):
-            file_id = data['file_id']
-            category = data['category']
-
-            print(f"\n📹 Processing video {i}/{len(video_data)}: {file_id}")
-            print(f"   Category: {category}")
-
-            try:
-                # Process single video completely before moving to next
-                success, input_path, output_path = self.process_single_video(data)
-
+        # Clear temp downloads left in the trash by an interrupted earlier run
+        self.empty_trash()
+        self._batch_running = True
+        try:
+            successful = []
+            failed = []
+
+            print(f"\n🚀 Starting pipelined processing with smart throttling...")
+            print(f"   Processing {len(video_data)} videos")
+            print(f"   Downloads: one at a time | FFmpeg: up to {self.max_workers} in parallel")
+            print(f"   Each video: Download → (next download starts) → Process → Cleanup")
+            print(f"   Using persistent session + randomized delays + batch pauses")
+            print(f"   Throttling: {self.min_delay}-{self.max_delay}s delays, pause every {self.batch_size} downloads")
+
+            def record_result(data: Dict[str, str], success: bool, input_path: str, output_path: str):
+                file_id = data['file_id']
                 if success:
                     successful.append({
                         'file_id': file_id,
-                        'category': category,
+                        'category': data['category'],
+                        'categories': data['categories'],
                         'input_path': input_path,
                         'output_path': output_path
                     })
-                    print(f"✅ {file_id} completed successfully")
+                    logger.info(f"✅ {file_id} completed successfully")
                 else:
                     failed.append({
                         'file_id': file_id,
-                        'category': category,
+                        'category': data['category'],
+                        'categories': data['categories'],
                         'error': output_path
                     })
-                    print(f"❌ {file_id} failed: {output_path}")
+                    logger.error(f"❌ {file_id} failed: {output_path}")
+                print_progress()
 
-            except Exception as e:
+            def record_exception(data: Dict[str, str], error: Exception):
                 failed.append({
-                    'file_id': file_id,
-                    'category': category,
-                    'error': str(e)
+                    'file_id': data['file_id'],
+                    'category': data['category'],
+                    'categories': data['categories'],
+                    'error': str(error)
                 })
-                print(f"❌ {file_id} exception: {e}")
-
-            # Show progress after each video
-            completed = len(successful) + len(failed)
-            print(f"📊 Progress: {completed}/{len(video_data)} ({completed/len(video_data)*100:.1f}%)")
-            print(f"   ✅ Successful: {len(successful)} | ❌ Failed: {len(failed)}")
-        
-        # Results summary
-        results = {
-            'total': len(video_data),
-            'successful': len(successful),
-            'failed': len(failed),
-            'success_rate': len(successful) / len(video_data) * 100 if video_data else 0,
-            'successful_items': successful,
-            'failed_items': failed
-        }
-        
-        # Clean up session
-        self.cleanup_session()
-
-        return results
-
-    def cleanup_session(self):
-        """Clean up the persistent gdown session and restore original behavior."""
-        if self.gdown_session:
-            try:
-                # Restore original requests.Session if we patched it
-                if hasattr(self, '_original_requests_session'):
-                    import requests
-                    requests.Session = self._original_requests_session
-                    print(f"🔗 Restored original session behavior")
-
-                # Close our persistent session
-                self.gdown_session.close()
-                print(f"🔗 Closed persistent download session")
-            except Exception as e:
-                print(f"⚠️  Error during session cleanup: {e}")
+                logger.error(f"❌ {data['file_id']} exception: {error}")
+                print_progress()
+
+            def print_progress():
+                if progress_bar is not None:
+                    progress_bar.update(1)
+                    progress_bar.set_postfix(ok=len(successful), fail=len(failed), refresh=False)
+                    return
+                completed = len(successful) + len(failed)
+                logger.info(f"📊 Progress: {completed}/{len(video_data)} ({completed/len(video_data)*100:.1f}%)")
+                logger.info(f"   ✅ Successful: {len(successful)} | ❌ Failed: {len(failed)}")
+
+            def collect(future, data: Dict[str, str]):
+                try:
+                    record_result(data, *future.result())
+                except Exception as e:
+                    record_exception(data, e)
+
+            # Cap queued conversions so downloads can't run far ahead of FFmpeg and
+            # pile up temp files (and pending futures) for the whole CSV
+            max_in_flight = 2 * max(1, self.max_workers)
+
+            # Status lines are written above the bar so they don't tear it
+            progress_bar = None
+            if tqdm is not None and sys.stdout.isatty():
+                progress_bar = tqdm(total=len(video_data), unit="vid")
+
+            with (logging_redirect_tqdm(loggers=[logger]) if progress_bar is not None else nullcontext()), \
+                    ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                in_flight = {}
+
+                for i, data in enumerate(video_data, 1):
+                    file_id = data['file_id']
+
+                    if len(in_flight) >= max_in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future, in_flight.pop(future))
+
+                    logger.info(f"\n📹 Processing video {i}/{len(video_data)}: {file_id}")
+                    logger.info(f"   Category: {', '.join(data['categories'])}")
+
+                    try:
+                        # Download stage runs here so throttling stays sequential
+                        result, source_path, is_temp = self.fetch_source_video(data)
+                        if result is not None:
+                            record_result(data, *result)
+                        else:
+                            future = executor.submit(self.convert_source_video, file_id, source_path, is_temp)
+                            in_flight[future] = data
+                    except Exception as e:
+                        record_exception(data, e)
+
+                    # Collect conversions that finished while we were downloading
+                    for future in [f for f in in_flight if f.done()]:
+                        collect(future, in_flight.pop(future))
+
+                # Drain the remaining conversions
+                for future in as_completed(in_flight):
+                    collect(future, in_flight[future])
+
+            if progress_bar is not None:
+                progress_bar.close()
+
+            # Results summary
+            results = {
+                'total': len(video_data),
+                'successful': len(successful),
+                'failed': len(failed),
+                'success_rate': len(successful) / len(video_data) * 100 if video_data else 0,
+                'successful_items': successful,
+                'failed_items': failed
+            }
+
+            return results
+        finally:
+            # Delete the temp downloads set aside during the run and drop the
+            # pooled connections, even if it was interrupted or raised
+            self._batch_running = False
+            self.empty_trash()
+            self.close()
+
+    def close(self):
+        """Close the download session's pooled connections (it reconnects if used again)."""
+        self.download_session.close()
 
-            self.gdown_session = None
-    
     def print_results_summary(self, results: Dict[str, any]):
         """Print processing results summary."""
         print(f"\n📊 PROCESSING RESULTS")
@@ -601,26 +1160,24 @@ class BatchVideoProcessor:
         if self.failed_downloads:
             print(f"\n🔒 PERMANENT FAILURES ({len(self.failed_downloads)} videos):")
             print(f"   These FileIDs failed after exponential backoff retries:")
-            failed_list = sorted(self.failed_downloads)
-            for i, file_id in enumerate(failed_list):
-                if i < 10:  # Show first 10
-                    attempts = self.retry_attempts.get(file_id, 1)
-                    print(f"   {file_id} (tried {attempts} times)")
-                elif i == 10:
-                    print(f"   ... and {len(self.failed_downloads) - 10} more")
-                    break
+            # Only the first 10 are shown, so select them without sorting the whole set
+            for file_id in heapq.nsmallest(10, self.failed_downloads):
+                attempts = self.retry_attempts.get(file_id, 1)
+                print(f"   {file_id} (tried {attempts} times)")
+            if len(self.failed_downloads) > 10:
+                print(f"   ... and {len(self.failed_downloads) - 10} more")
             print(f"   💡 These videos were permanently skipped after multiple retry attempts")
 
         if results['failed_items']:
             print(f"\n❌ PROCESSING FAILURES:")
-            for item in results['failed_items'][:10]:  # Show first 10 failures
+            for item in islice(results['failed_items'], 10):  # Show first 10 failures
                 print(f"  {item['file_id']} - {item['error']}")
             if len(results['failed_items']) > 10:
                 print(f"  ... and {len(results['failed_items']) - 10} more")
 
         if results['successful_items']:
             print(f"\n✅ SAMPLE SUCCESSFUL VIDEOS:")
-            for item in results['successful_items'][:5]:  # Show first 5 successes
+            for item in islice(results['successful_items'], 5):  # Show first 5 successes
                 print(f"  {item['file_id']} -> {Path(item['output_path']).name}")
 
 
@@ -648,6 +1205,9 @@ def main():
     BATCH_PAUSE_MIN = 10  # Minimum batch pause (minutes)
     BATCH_PAUSE_MAX = 15  # Maximum batch pause (minutes)
 
+    # Per-video status output (logging.WARNING shows only failures)
+    LOG_LEVEL = logging.INFO
+
     # ==========================================
     
     print("🎯 Configuration:")
@@ -658,6 +1218,8 @@ def main():
     print(f"   Max Workers: {MAX_WORKERS}")
     print(f"   Smart Throttling: {MIN_DELAY}-{MAX_DELAY}s delays, pause every {BATCH_SIZE} downloads")
 
+    logger.setLevel(LOG_LEVEL)
+
     try:
         # Create processor with smart throttling
         processor = BatchVideoProcessor(
@@ -41,84 +41,88 @@ def main():
             frame_rate=29.97,
             bitrate="6M",
             max_workers=1,
-            download_delay=0.0  # No delay for status checking
+            min_delay=0.0,  # No delay for status checking
+            max_delay=0.0
         )
         
         # Check existing files
         print(f"\n📊 ANALYZING FILES...")
         existing_check = processor.check_existing_files(CSV_FILE)
         
+        # Build the report and write it in one go
+        report = []
+
         # Summary
-        print(f"\n📋 SUMMARY:")
-        print(f"   Total videos in CSV: {existing_check['total']}")
-        print(f"   ✅ Already processed: {existing_check['existing_processed']}")
-        print(f"   📁 Already downloaded: {existing_check['existing_downloads']}")
-        print(f"   📥 Need to download: {existing_check['need_download']}")
+        report.append(f"\n📋 SUMMARY:")
+        report.append(f"   Total videos in CSV: {existing_check['total']}")
+        report.append(f"   ✅ Already processed: {existing_check['existing_processed']}")
+        report.append(f"   📁 Already downloaded: {existing_check['existing_downloads']}")
+        report.append(f"   📥 Need to download: {existing_check['need_download']}")
         
         # Progress calculation
         if existing_check['total'] > 0:
             processed_percent = (existing_check['existing_processed'] / existing_check['total']) * 100
             downloaded_percent = (existing_check['existing_downloads'] / existing_check['total']) * 100
             
-            print(f"\n📈 PROGRESS:")
-            print(f"   Processing: {processed_percent:.1f}% complete")
-            print(f"   Downloads: {downloaded_percent:.1f}% available")
+            report.append(f"\n📈 PROGRESS:")
+            report.append(f"   Processing: {processed_percent:.1f}% complete")
+            report.append(f"   Downloads: {downloaded_percent:.1f}% available")
         
         # Work remaining
         videos_to_process = existing_check['existing_downloads'] + existing_check['need_download']
         videos_to_download = existing_check['need_download']
         
-        print(f"\n⚡ WORK REMAINING:")
-        print(f"   Videos to download: {videos_to_download}")
-        print(f"   Videos to process: {videos_to_process}")
+        report.append(f"\n⚡ WORK REMAINING:")
+        report.append(f"   Videos to download: {videos_to_download}")
+        report.append(f"   Videos to process: {videos_to_process}")
         
         # Time estimates
         if videos_to_download > 0:
             download_time_min = videos_to_download * 0.5  # 30 seconds per video (optimistic)
             download_time_max = videos_to_download * 3    # 3 minutes per video (with limits)
-            print(f"   Estimated download time: {download_time_min:.0f}-{download_time_max:.0f} minutes")
+            report.append(f"   Estimated download time: {download_time_min:.0f}-{download_time_max:.0f} minutes")
         
         if videos_to_process > 0:
             process_time_min = videos_to_process * 1      # 1 minute per video (optimistic)
             process_time_max = videos_to_process * 3      # 3 minutes per video (conservative)
-            print(f"   Estimated processing time: {process_time_min:.0f}-{process_time_max:.0f} minutes")
+            report.append(f"   Estimated processing time: {process_time_min:.0f}-{process_time_max:.0f} minutes")
         
         # Show sample files
         if existing_check['existing_processed']:
-            print(f"\n✅ SAMPLE PROCESSED FILES:")
+            report.append(f"\n✅ SAMPLE PROCESSED FILES:")
             for file_id in existing_check['processed_files'][:5]:
-                print(f"   {file_id}.mp4")
+                report.append(f"   {file_id}.mp4")
             if len(existing_check['processed_files']) > 5:
-                print(f"   ... and {len(existing_check['processed_files']) - 5} more")
+                report.append(f"   ... and {len(existing_check['processed_files']) - 5} more")
         
         if existing_check['existing_downloads']:
-            print(f"\n📁 SAMPLE DOWNLOADED FILES:")
+            report.append(f"\n📁 SAMPLE DOWNLOADED FILES:")
             for file_id in existing_check['download_files'][:5]:
-                print(f"   {file_id}")
+                report.append(f"   {file_id}")
             if len(existing_check['download_files']) > 5:
-                print(f"   ... and {len(existing_check['download_files']) - 5} more")
+                report.append(f"   ... and {len(existing_check['download_files']) - 5} more")
         
         if existing_check['need_download']:
-            print(f"\n📥 SAMPLE FILES NEEDING DOWNLOAD:")
+            report.append(f"\n📥 SAMPLE FILES NEEDING DOWNLOAD:")
             for file_id in existing_check['need_processing_files'][:5]:
-                print(f"   {file_id}")
+                report.append(f"   {file_id}")
             if len(existing_check['need_processing_files']) > 5:
-                print(f"   ... and {len(existing_check['need_processing_files']) - 5} more")
+                report.append(f"   ... and {len(existing_check['need_processing_files']) - 5} more")
         
         # Recommendations
-        print(f"\n💡 RECOMMENDATIONS:")
+        report.append(f"\n💡 RECOMMENDATIONS:")
         
         if existing_check['existing_processed'] == existing_check['total']:
-            print("   🎉 All videos are processed! You're ready for sequence generation.")
+            report.append("   🎉 All videos are processed! You're ready for sequence generation.")
         elif videos_to_process == 0:
-            print("   ⚠️  No videos need processing. Check your file paths.")
+            report.append("   ⚠️  No videos need processing. Check your file paths.")
         elif videos_to_download > 100:
-            print("   📋 Large batch detected. Consider processing in smaller chunks.")
-            print("   🕐 Process during off-peak hours to avoid Google Drive limits.")
+            report.append("   📋 Large batch detected. Consider processing in smaller chunks.")
+            report.append("   🕐 Process during off-peak hours to avoid Google Drive limits.")
         elif videos_to_download > 0:
-            print("   🚀 Ready to download and process. Run: python download_and_process.py")
+            report.append("   🚀 Ready to download and process. Run: python download_and_process.py")
         else:
-            print("   ⚡ All videos downloaded. Ready for processing only.")
+            report.append("   ⚡ All videos downloaded. Ready for processing only.")
         
         # Disk space check
         try:
@@ -129,29 +133,31 @@ def main():
             # Estimate space needed (assume ~50MB per processed video)
             space_needed_gb = videos_to_process * 0.05
             
-            print(f"\n💾 DISK SPACE:")
-            print(f"   Available: {free_gb:.1f} GB")
-            print(f"   Estimated needed: {space_needed_gb:.1f} GB")
+            report.append(f"\n💾 DISK SPACE:")
+            report.append(f"   Available: {free_gb:.1f} GB")
+            report.append(f"   Estimated needed: {space_needed_gb:.1f} GB")
             
             if free_gb < space_needed_gb * 2:  # Need 2x for temp files
-                print("   ⚠️  Low disk space! Consider freeing up space first.")
+                report.append("   ⚠️  Low disk space! Consider freeing up space first.")
             else:
-                print("   ✅ Sufficient disk space available")
+                report.append("   ✅ Sufficient disk space available")
                 
         except:
-            print(f"\n💾 DISK SPACE: Unable to check")
+            report.append(f"\n💾 DISK SPACE: Unable to check")
         
         # Next steps
-        print(f"\n📋 NEXT STEPS:")
+        report.append(f"\n📋 NEXT STEPS:")
         if existing_check['existing_processed'] == existing_check['total']:
-            print("   1. All done! Use processed videos for sequence generation")
+            report.append("   1. All done! Use processed videos for sequence generation")
         elif videos_to_process > 0:
-            print("   1. Run: python download_and_process.py")
-            print("   2. Wait for processing to complete")
-            print("   3. Check results in processed_videos/ folder")
+            report.append("   1. Run: python download_and_process.py")
+            report.append("   2. Wait for processing to complete")
+            report.append("   3. Check results in processed_videos/ folder")
         else:
-            print("   1. Check file paths and CSV data")
-            print("   2. Verify Google Drive FileIDs are accessible")
+            report.append("   1. Check file paths and CSV data")
+            report.append("   2. Verify Google Drive FileIDs are accessible")
+
+        print("\n".join(report))
         
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -12,13 +12,30 @@ Date: 2025-01-06
 """
 
 import csv
+import json
 import os
 import subprocess
 import tempfile
+import threading
 import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+# Optional: PyArrow's multithreaded C++ CSV parser for large inventories
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa_csv = None
+
+# Parsed CSV files keyed by (path, mtime, size): (columns, values by column)
+_csv_cache: Dict[Tuple[str, int, int], Tuple[List[str], Dict[str, List[str]]]] = {}
+
+# Number of category values listed per page in select_category_values
+CATEGORY_PAGE_SIZE = 50
+
 def main():
     print("🎬 COMPLETE VIDEO PROCESSING PIPELINE")
     print("=" * 60)
@@ -70,67 +87,69 @@ def run_sequence_generation():
     # Step 3: Show CSV preview
     show_csv_preview(columns, sample_rows)
     
-    # Main workflow with back navigation
+    # Main workflow with back navigation. Each step names the one to run
+    # next, so going back never re-reads the CSV or grows the call stack.
     field_mapping = None
     category_filters = None
     params = None
+    step = 'field_mapping'
     
-    # Step 4: Get field mapping (with back navigation)
-    while field_mapping is None:
-        field_mapping = get_field_mapping(columns)
-    
-    # Step 5: Get category value selections (with back navigation)
-    while category_filters is None:
-        result = get_category_values(field_mapping, csv_file)
-        if result == 'back':
-            field_mapping = None
-            continue
-        elif not result:
-            print("❌ No category fields selected. Cannot generate sequence.")
-            return None
-        else:
-            category_filters = result
-    
-    # Step 6: Get sequence parameters (with back navigation)
-    while params is None:
-        result = get_sequence_parameters()
-        if result == 'back':
-            category_filters = None
-            continue
-        else:
-            params = result
-    
-    # Step 7: Show summary and confirm
-    while True:
-        print(f"\n📋 GENERATION SUMMARY")
-        print("-" * 30)
-        print(f"Input File: {csv_file}")
-        print(f"Output File: {params['output_file']}")
-        print(f"Sequence Length: {params['sequence_length']}")
-        print(f"Min Spacing: {params['min_spacing']}")
-        print(f"Field Mapping:")
-        for field_type, column_name in field_mapping.items():
-            if column_name:
-                print(f"   {field_type}: {column_name}")
-        print(f"Category Filters:")
-        for field_name, values in category_filters.items():
-            print(f"   {field_name}: {values}")
+    while step != 'generate':
+        if step == 'field_mapping':
+            # Step 4: Get field mapping
+            field_mapping = get_field_mapping(columns)
+            step = 'category_values'
         
-        confirm = input(f"\nProceed with generation? (y/n/back): ").lower().strip()
-        if confirm == 'y':
-            break
-        elif confirm == 'back':
-            params = None
-            break
-        elif confirm == 'n':
-            print("❌ Cancelled.")
-            return None
-        else:
-            print("❌ Please enter 'y' for yes, 'n' for no, or 'back' to modify parameters.")
-    
-    # If we got here and params is None, user went back
-    if params is None:
-        return run_sequence_generation()  # Restart
+        elif step == 'category_values':
+            # Step 5: Get category value selections
+            result = get_category_values(field_mapping, csv_file)
+            if result == 'back':
+                step = 'field_mapping'
+            elif not result:
+                print("❌ No category fields selected. Cannot generate sequence.")
+                return None
+            else:
+                category_filters = result
+                step = 'sequence_parameters'
+        
+        elif step == 'sequence_parameters':
+            # Step 6: Get sequence parameters
+            result = get_sequence_parameters()
+            if result == 'back':
+                step = 'category_values'
+            else:
+                params = result
+                step = 'summary'
+        
+        elif step == 'summary':
+            # Step 7: Show summary and confirm
+            summary = [
+                f"\n📋 GENERATION SUMMARY",
+                "-" * 30,
+                f"Input File: {csv_file}",
+                f"Output File: {params['output_file']}",
+                f"Sequence Length: {params['sequence_length']}",
+                f"Min Spacing: {params['min_spacing']}",
+                f"Field Mapping:",
+            ]
+            for field_type, column_name in field_mapping.items():
+                if column_name:
+                    summary.append(f"   {field_type}: {column_name}")
+            summary.append(f"Category Filters:")
+            for field_name, values in category_filters.items():
+                summary.append(f"   {field_name}: {values}")
+            print("\n".join(summary))
+            
+            confirm = input(f"\nProceed with generation? (y/n/back): ").lower().strip()
+            if confirm == 'y':
+                step = 'generate'
+            elif confirm == 'back':
+                step = 'sequence_parameters'
+            elif confirm == 'n':
+                print("❌ Cancelled.")
+                return None
+            else:
+                print("❌ Please enter 'y' for yes, 'n' for no, or 'back' to modify parameters.")
     
     # Step 8: Generate sequence
     print(f"\n🎲 GENERATING SEQUENCE...")
@@ -188,11 +207,12 @@ def run_video_concatenation(sequence_file):
     print(f"❌ Missing: {len(missing_items)} videos")
     
     if missing_items:
-        print(f"\n⚠️  Missing videos:")
+        missing_lines = [f"\n⚠️  Missing videos:"]
         for item in missing_items[:10]:  # Show first 10
-            print(f"   {item['item_no']:3d}. {item['name']} (ID: {item['unique_id']})")
+            missing_lines.append(f"   {item['item_no']:3d}. {item['name']} (ID: {item['unique_id']})")
         if len(missing_items) > 10:
-            print(f"   ... and {len(missing_items) - 10} more")
+            missing_lines.append(f"   ... and {len(missing_items) - 10} more")
+        print("\n".join(missing_lines))
     
     if not found_videos:
         print("❌ No videos found to concatenate")
@@ -240,21 +260,67 @@ def get_csv_file() -> str:
             
         return csv_file
 
+def _csv_columns(reader, header: List[str]) -> Dict[str, List[str]]:
+    """Collect the remaining rows of a csv.reader into a list of values per column."""
+    rows = [row for row in reader if row]  # Skip blank lines
+    return {col: [row[i] if i < len(row) else '' for row in rows]
+            for i, col in enumerate(header)}
+
+def load_csv_columns(csv_file: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Parse a CSV file once into its header and a list of values per column.
+
+    The result is cached until the file's mtime or size changes, so the
+    structure analysis and every category lookup share a single parse.
+    """
+    stat = os.stat(csv_file)
+    cache_key = (os.path.abspath(csv_file), stat.st_mtime_ns, stat.st_size)
+    if cache_key in _csv_cache:
+        return _csv_cache[cache_key]
+
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+
+        # Table.to_pydict() would collapse repeated column names, so those
+        # files go through the csv module, which keeps the last one
+        use_pyarrow = pa_csv is not None and len(set(header)) == len(header)
+        if not use_pyarrow:
+            values = _csv_columns(reader, header)
+
+    if use_pyarrow:
+        try:
+            # Keep every column as text, like the csv module would
+            table = pa_csv.read_csv(
+                csv_file,
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: pa.string() for col in header},
+                    strings_can_be_null=False
+                )
+            )
+            header = table.column_names
+            values = table.to_pydict()
+        except pa.ArrowInvalid:
+            # e.g. ragged rows, which csv.reader accepts; load them the same way
+            with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+                reader = csv.reader(file)
+                header = next(reader, [])
+                values = _csv_columns(reader, header)
+
+    _csv_cache[cache_key] = (header, values)
+    return header, values
+
 def analyze_csv_structure(csv_file: str) -> Tuple[List[str], List[Dict]]:
     """Analyze CSV file structure and return columns and sample data."""
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            columns = reader.fieldnames or []
-            
-            # Get first few rows as samples
-            sample_rows = []
-            for i, row in enumerate(reader):
-                if i >= 3:  # Only get first 3 rows
-                    break
-                sample_rows.append(row)
-            
-            return columns, sample_rows
+        columns, values = load_csv_columns(csv_file)
+
+        # Get first few rows as samples
+        row_count = len(values[columns[0]]) if columns else 0
+        sample_rows = [{col: values[col][i] for col in columns} for i in range(min(3, row_count))]
+
+        return columns, sample_rows
             
     except Exception as e:
         print(f"❌ Error reading CSV file: {e}")
@@ -262,23 +328,23 @@ def analyze_csv_structure(csv_file: str) -> Tuple[List[str], List[Dict]]:
 
 def show_csv_preview(columns: List[str], sample_rows: List[Dict]):
     """Display CSV structure preview to user."""
-    print(f"\n📊 CSV STRUCTURE ANALYSIS")
-    print("-" * 30)
-    print(f"Found {len(columns)} columns:")
+    # Collect the whole preview and print it in one write
+    lines = [f"\n📊 CSV STRUCTURE ANALYSIS", "-" * 30, f"Found {len(columns)} columns:"]
     for i, col in enumerate(columns, 1):
-        print(f"    {i}. {col}")
+        lines.append(f"    {i}. {col}")
     
-    print(f"\n📋 Sample Data (first {len(sample_rows)} rows):")
-    print("-" * 50)
+    lines.append(f"\n📋 Sample Data (first {len(sample_rows)} rows):")
+    lines.append("-" * 50)
     for i, row in enumerate(sample_rows, 1):
-        print(f"Row {i}:")
+        lines.append(f"Row {i}:")
         for col in columns:
             value = row.get(col, '')
             # Truncate long values
             if len(value) > 30:
                 value = value[:27] + "..."
-            print(f"   {col}: {value}")
-        print()
+            lines.append(f"   {col}: {value}")
+        lines.append("")
+    print("\n".join(lines))
 
 # Helper functions for sequence generation
 def get_field_mapping(columns: List[str]) -> Dict[str, str]:
@@ -366,24 +432,26 @@ def select_column(columns: List[str], required: bool = True, used_columns: set =
     if used_columns is None:
         used_columns = set()
 
-    while True:
-        print(f"\nAvailable columns:")
-        available_columns = []
-        for i, col in enumerate(columns, 1):
-            if col in used_columns:
-                print(f"   {i:2d}. {col} [ALREADY USED]")
-            else:
-                print(f"   {i:2d}. {col}")
-                available_columns.append((i, col))
+    # The menu only depends on the arguments, so render it once and keep
+    # retries after invalid input down to the error line and the prompt.
+    menu_lines = ["\nAvailable columns:"]
+    for i, col in enumerate(columns, 1):
+        if col in used_columns:
+            menu_lines.append(f"   {i:2d}. {col} [ALREADY USED]")
+        else:
+            menu_lines.append(f"   {i:2d}. {col}")
 
-        option_num = len(columns) + 1
-        if not required:
-            print(f"   {option_num:2d}. [Skip this field]")
-            option_num += 1
+    option_num = len(columns) + 1
+    if not required:
+        menu_lines.append(f"   {option_num:2d}. [Skip this field]")
+        option_num += 1
 
-        if allow_back:
-            print(f"   {option_num:2d}. [Go back to previous step]")
+    if allow_back:
+        menu_lines.append(f"   {option_num:2d}. [Go back to previous step]")
 
+    print("\n".join(menu_lines))
+
+    while True:
         try:
             choice = input(f"\nSelect column number (or type 'back'): ").strip().lower()
 
@@ -434,13 +502,17 @@ def get_category_values(field_mapping: Dict[str, str], csv_file: str):
 
     category_filters = {}
 
-    # Analyze unique values for each category field
-    for field_type in ['category_1', 'category_2', 'category_3']:
-        if field_type not in field_mapping or not field_mapping[field_type]:
-            continue
+    # Collect the unique values of every mapped category field in one go
+    category_fields = [field_type for field_type in ['category_1', 'category_2', 'category_3']
+                       if field_mapping.get(field_type)]
+    unique_values_by_column = get_unique_values_batch(
+        csv_file, [field_mapping[field_type] for field_type in category_fields]
+    )
 
+    # Analyze unique values for each category field
+    for field_type in category_fields:
         column_name = field_mapping[field_type]
-        unique_values = get_unique_values(csv_file, column_name)
+        unique_values = unique_values_by_column.get(column_name, [])
 
         if not unique_values:
             continue
@@ -461,25 +533,42 @@ def get_category_values(field_mapping: Dict[str, str], csv_file: str):
 
 def get_unique_values(csv_file: str, column_name: str) -> List[str]:
     """Get unique values from a specific column in CSV file."""
-    unique_values = set()
+    return get_unique_values_batch(csv_file, [column_name]).get(column_name, [])
+
+def get_unique_values_batch(csv_file: str, column_names: List[str]) -> Dict[str, List[str]]:
+    """Get the unique non-blank values of several columns from one parse of the CSV file."""
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if column_name in row and row[column_name].strip():
-                    unique_values.add(row[column_name].strip())
-        return list(unique_values)
+        _, values = load_csv_columns(csv_file)
     except Exception as e:
         print(f"❌ Error reading CSV file: {e}")
-        return []
+        return {}
+
+    unique_by_column = {}
+    for column_name in column_names:
+        unique_values = {value.strip() for value in values.get(column_name, ())}
+        unique_values.discard('')
+        unique_by_column[column_name] = list(unique_values)
+    return unique_by_column
 
 def select_category_values(available_values: List[str], level_name: str):
     """Let user select which category values to include with back navigation."""
     print(f"\nSelect {level_name} category values to include:")
     print("Enter numbers separated by commas (e.g., 1,3,5), 'all' for all values, or 'back' to go back:")
 
-    for i, value in enumerate(available_values, 1):
-        print(f"   {i:2d}. {value}")
+    # High-cardinality columns are listed a page at a time; each page is
+    # printed in one write and numbering stays global across pages.
+    page_count = max(1, -(-len(available_values) // CATEGORY_PAGE_SIZE))
+    page = 0
+
+    def show_page():
+        start = page * CATEGORY_PAGE_SIZE
+        page_values = available_values[start:start + CATEGORY_PAGE_SIZE]
+        lines = [f"   {i:2d}. {value}" for i, value in enumerate(page_values, start + 1)]
+        if page_count > 1:
+            lines.append(f"   (page {page + 1}/{page_count} - 'n' next page, 'p' previous page)")
+        print("\n".join(lines))
+
+    show_page()
 
     while True:
         choice = input(f"\nYour selection: ").strip().lower()
@@ -487,6 +576,11 @@ def select_category_values(available_values: List[str], level_name: str):
         if choice == 'back':
             return 'back'
 
+        if choice in ('n', 'p') and page_count > 1:
+            page = (page + (1 if choice == 'n' else -1)) % page_count
+            show_page()
+            continue
+
         if choice == 'all':
             print(f"✅ Selected all {len(available_values)} values")
             return available_values
@@ -517,6 +611,15 @@ def select_category_values(available_values: List[str], level_name: str):
         except ValueError:
             print("❌ Please enter numbers separated by commas, 'all', or 'back'")
 
+def _read_choice(prompt: str) -> Tuple[str, str]:
+    """Read a line of input, returning it stripped as typed and lowercased.
+
+    The lowercased form is for matching keywords such as 'back'; the raw
+    form keeps user-supplied values like filenames intact.
+    """
+    raw = input(prompt).strip()
+    return raw, raw.lower()
+
 def get_sequence_parameters() -> Dict:
     """Get sequence generation parameters from user with validation and back navigation."""
     print(f"\n⚙️  SEQUENCE PARAMETERS")
@@ -565,15 +668,15 @@ def get_sequence_parameters() -> Dict:
 
     # Get output file
     while True:
-        output_input = input("Output CSV filename? (default: generated_sequence.csv): ").strip().lower()
-        if output_input == 'back':
+        output_input, output_choice = _read_choice("Output CSV filename? (default: generated_sequence.csv): ")
+        if output_choice == 'back':
             return 'back'
         elif not output_input:
             params['output_file'] = "generated_sequence.csv"
             break
         else:
             # Validate filename
-            if not output_input.endswith('.csv'):
+            if not output_choice.endswith('.csv'):
                 output_input += '.csv'
             params['output_file'] = output_input
             break
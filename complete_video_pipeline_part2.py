@@ -1,6 +1,21 @@
 # Additional functions for complete_video_pipeline.py
 # This file contains the remaining helper functions
 
+# Partial filename matching shared with the standalone concatenator
+from video_concatenator import build_partial_match_index, find_partial_match
+
+# File extensions treated as videos when scanning a directory
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'})
+
+# Lines of FFmpeg stderr kept for error reports
+FFMPEG_STDERR_TAIL_LINES = 200
+
+# Video files per directory keyed by (path, directory mtime): {stem: filename}
+_video_index_cache: Dict[Tuple[str, int], Dict[str, str]] = {}
+
+# Stream signatures from ffprobe keyed by (path, mtime, size)
+_stream_signature_cache: Dict[Tuple[str, int, int], Tuple] = {}
+
 def generate_sequence_with_custom_mapping(
     csv_file: str,
     field_mapping: Dict[str, str],
@@ -13,28 +28,34 @@ def generate_sequence_with_custom_mapping(
     try:
         print(f"📊 Loading clips from {csv_file}...")
         
-        # Load and filter clips based on category selections
-        clips = []
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                # Check if this clip matches our category filters
-                matches = True
-                for column_name, allowed_values in category_filters.items():
-                    if column_name in row:
-                        if row[column_name].strip() not in allowed_values:
-                            matches = False
-                            break
-                    else:
-                        matches = False
-                        break
-                
-                if matches:
-                    clips.append({
-                        'unique_id': row[field_mapping['unique_id']].strip(),
-                        'name': row[field_mapping['name']].strip(),
-                        'category': row[field_mapping['category_1']].strip()
-                    })
+        # Load and filter clips based on category selections. The columns come
+        # from the parse already cached during CSV analysis, and the filters
+        # are applied a column at a time instead of building a dict per row
+        columns, values = load_csv_columns(csv_file)
+        row_count = len(values[columns[0]]) if columns else 0
+        
+        matches = [True] * row_count
+        for column_name, allowed_values in category_filters.items():
+            if column_name not in values:
+                matches = [False] * row_count
+                break
+            allowed_values = frozenset(allowed_values)  # hash lookups, not list scans
+            matches = [
+                matched and value.strip() in allowed_values
+                for matched, value in zip(matches, values[column_name])
+            ]
+        
+        unique_ids = values[field_mapping['unique_id']]
+        names = values[field_mapping['name']]
+        categories = values[field_mapping['category_1']]
+        clips = [
+            {
+                'unique_id': unique_ids[i].strip(),
+                'name': names[i].strip(),
+                'category': categories[i].strip()
+            }
+            for i, matched in enumerate(matches) if matched
+        ]
         
         print(f"✅ Found {len(clips)} clips matching your criteria")
         
@@ -71,14 +92,12 @@ def generate_sequence_with_custom_mapping(
             # Write header
             writer.writerow(['item_no', 'unique_id', 'name', 'category'])
             
-            # Write sequence
-            for i, clip in enumerate(sequence, 1):
-                writer.writerow([
-                    i,
-                    clip['unique_id'],
-                    clip['name'],
-                    clip['category']
-                ])
+            # Write sequence; writerows hands every row to the csv module's C
+            # writer in one call and keeps its quoting of commas and quotes
+            writer.writerows(
+                (i, clip['unique_id'], clip['name'], clip['category'])
+                for i, clip in enumerate(sequence, 1)
+            )
         
         print(f"✅ Successfully generated {len(sequence)} clip sequence!")
         return True
@@ -92,53 +111,111 @@ def generate_spaced_sequence(clips_by_category: Dict[str, List], target_length:
     if not clips_by_category:
         return []
     
-    # Create a pool of all clips
-    all_clips = []
+    # Shuffle each category's clips once. The search below only decides the
+    # order of categories and takes clips from these pools in turn. Categories
+    # are referred to by their index in pools, so the bookkeeping is plain
+    # lists indexed by small ints rather than dicts keyed by category name
+    pools = []
     for category_clips in clips_by_category.values():
-        all_clips.extend(category_clips)
-    
-    if len(all_clips) < target_length:
-        target_length = len(all_clips)
-    
-    # Simple approach: try multiple times to generate a valid sequence
-    for attempt in range(100):  # Try up to 100 times
-        sequence = []
-        available_clips = all_clips.copy()
-        random.shuffle(available_clips)
-        
-        for _ in range(target_length):
-            # Find a clip that satisfies spacing constraint
-            for i, clip in enumerate(available_clips):
-                if can_place_clip(sequence, clip, min_spacing):
-                    sequence.append(clip)
-                    available_clips.pop(i)
-                    break
-            else:
-                # No valid clip found, try next attempt
-                break
-        
-        if len(sequence) == target_length:
-            return sequence
-    
+        if category_clips:
+            pool = list(category_clips)
+            random.shuffle(pool)
+            pools.append(pool)
+
+    total_clips = sum(len(pool) for pool in pools)
+    if total_clips < target_length:
+        target_length = total_clips
+
+    # Backtracking search: each position tries the eligible categories in a
+    # random order weighted by clips left, and a branch is abandoned as soon
+    # as the categories can no longer fill the remaining slots. Work is
+    # capped at roughly what the old 100 random restarts could cost.
+    used = [0] * len(pools)
+    last_placed_at = [None] * len(pools)  # category -> index of its latest clip
+    sequence = []
+    stack = []  # per position: [candidate categories, next candidate, placed category, its previous index]
+    steps_left = 100 * target_length
+
+    while len(sequence) < target_length and steps_left > 0:
+        position = len(sequence)
+
+        if len(stack) == position:
+            candidates = []
+            if can_fill_remaining(position, target_length, pools, used, last_placed_at, min_spacing):
+                candidates = [
+                    category for category, pool in enumerate(pools)
+                    if used[category] < len(pool)
+                    and can_place_clip(position, category, last_placed_at, min_spacing)
+                ]
+                candidates.sort(
+                    key=lambda category: random.random() ** (1.0 / (len(pools[category]) - used[category])),
+                    reverse=True
+                )
+            stack.append([candidates, 0, None, None])
+
+        frame = stack[-1]
+        if frame[1] < len(frame[0]):
+            # Place the next candidate category at this position
+            category = frame[0][frame[1]]
+            frame[1] += 1
+            frame[2], frame[3] = category, last_placed_at[category]
+            sequence.append(pools[category][used[category]])
+            used[category] += 1
+            last_placed_at[category] = position
+            steps_left -= 1
+            continue
+
+        # Every candidate failed here: undo the previous placement and let
+        # that position try its next candidate
+        stack.pop()
+        if not stack:
+            break
+        category, previous_position = stack[-1][2], stack[-1][3]
+        sequence.pop()
+        used[category] -= 1
+        last_placed_at[category] = previous_position
+
+    if len(sequence) == target_length:
+        return sequence
+
     # If we couldn't generate full sequence with spacing, generate without strict spacing
     print(f"⚠️  Could not maintain {min_spacing} spacing for all clips, using best effort...")
+    all_clips = [clip for pool in pools for clip in pool]
     random.shuffle(all_clips)
     return all_clips[:target_length]
 
-def can_place_clip(sequence: List[Dict], clip: Dict, min_spacing: int) -> bool:
-    """Check if a clip can be placed at the end of sequence with spacing constraint."""
-    if not sequence:
-        return True
-    
-    category = clip['category']
-    
-    # Check last min_spacing positions
-    check_positions = min(len(sequence), min_spacing)
-    for i in range(check_positions):
-        if sequence[-(i+1)]['category'] == category:
-            return False
-    
-    return True
+def can_place_clip(position: int, category: int, last_placed_at: List[Optional[int]], min_spacing: int) -> bool:
+    """Check if a clip of category can be placed at position with spacing constraint.
+
+    last_placed_at holds the index of each category's most recent clip (None
+    if not placed yet), so the check is a single lookup instead of a scan of
+    the sequence tail.
+    """
+    last_position = last_placed_at[category]
+    return last_position is None or position - last_position > min_spacing
+
+def can_fill_remaining(position: int, target_length: int, pools: List[List[Dict]], used: List[int],
+                       last_placed_at: List[Optional[int]], min_spacing: int) -> bool:
+    """Check that the clips left can still cover every slot from position on.
+
+    Each category can fill at most one slot in every min_spacing + 1, starting
+    from the first slot its spacing allows, and no more slots than it has
+    clips left. If those upper bounds don't add up to the slots remaining,
+    no ordering of the clips left can complete the sequence.
+    """
+    slots_left = target_length - position
+    capacity = 0
+    for category, pool in enumerate(pools):
+        clips_left = len(pool) - used[category]
+        if not clips_left:
+            continue
+        last_position = last_placed_at[category]
+        first_slot = 0 if last_position is None else max(0, last_position + min_spacing + 1 - position)
+        if first_slot < slots_left:
+            capacity += min(clips_left, 1 + (slots_left - 1 - first_slot) // (min_spacing + 1))
+            if capacity >= slots_left:
+                return True
+    return capacity >= slots_left
 
 # Video concatenation functions
 def get_video_location() -> str:
@@ -161,11 +238,7 @@ def get_video_location() -> str:
             continue
             
         # Check if directory has video files
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
-        video_files = []
-        for file in os.listdir(video_dir):
-            if Path(file).suffix.lower() in video_extensions:
-                video_files.append(file)
+        video_files = list(scan_video_directory(video_dir).values())
         
         if not video_files:
             print(f"⚠️  No video files found in '{video_dir}'")
@@ -179,41 +252,62 @@ def get_video_location() -> str:
 
 def load_sequence_list(csv_file: str) -> List[Dict]:
     """Load sequence list from CSV file."""
-    sequence = []
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                sequence.append({
-                    'item_no': int(row['item_no']),
-                    'unique_id': row['unique_id'].strip(),
-                    'name': row['name'].strip(),
-                    'category': row.get('category', '').strip()
-                })
-        return sequence
+        columns, values = load_csv_columns(csv_file)
+        row_count = len(values[columns[0]]) if columns else 0
+        categories = values.get('category', [''] * row_count)
+        return [
+            {
+                'item_no': int(item_no),
+                'unique_id': unique_id.strip(),
+                'name': name.strip(),
+                'category': category.strip()
+            }
+            for item_no, unique_id, name, category in zip(
+                values['item_no'], values['unique_id'], values['name'], categories
+            )
+        ]
     except Exception as e:
         print(f"❌ Error loading sequence: {e}")
         return []
 
+def scan_video_directory(video_dir: str) -> Dict[str, str]:
+    """Index the video files in a directory by filename without extension.
+
+    A single os.scandir pass replaces listdir plus per-file Path parsing,
+    and lets every sequence item be matched with a dict lookup. The index is
+    cached until the directory's mtime changes, so validating the directory
+    and then matching the sequence share one scan.
+    """
+    cache_key = (os.path.abspath(video_dir), os.stat(video_dir).st_mtime_ns)
+    if cache_key in _video_index_cache:
+        return _video_index_cache[cache_key]
+
+    video_index = {}
+    with os.scandir(video_dir) as entries:
+        for entry in entries:
+            name_key, extension = os.path.splitext(entry.name)
+            if extension.lower() in VIDEO_EXTENSIONS and entry.is_file():
+                video_index[name_key] = entry.name
+    _video_index_cache[cache_key] = video_index
+    return video_index
+
 def find_video_files(video_dir: str, sequence: List[Dict]) -> Tuple[List[str], List[Dict]]:
     """Find video files matching the sequence list."""
     print(f"\n🔍 FINDING VIDEO FILES")
     print("-" * 30)
     
-    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
     found_videos = []
     missing_items = []
     
     # Get all video files in directory
-    all_video_files = {}
-    for file in os.listdir(video_dir):
-        if Path(file).suffix.lower() in video_extensions:
-            # Use filename without extension as key
-            name_key = Path(file).stem
-            all_video_files[name_key] = file
+    all_video_files = scan_video_directory(video_dir)
     
     print(f"📁 Found {len(all_video_files)} video files in directory")
     
+    # Built once so partial matches don't scan every file for every item
+    partial_index = build_partial_match_index(list(all_video_files))
+    
     # Match sequence items to video files
     for item in sequence:
         name = item['name']
@@ -232,17 +326,15 @@ def find_video_files(video_dir: str, sequence: List[Dict]) -> Tuple[List[str], L
         
         # Strategy 3: Partial name match
         else:
-            for file_key, file_name in all_video_files.items():
-                if name in file_key or file_key in name:
-                    video_file = file_name
-                    break
+            file_key = find_partial_match(name, partial_index)
+            if file_key is not None:
+                video_file = all_video_files[file_key]
         
         # Strategy 4: Partial unique_id match
         if not video_file:
-            for file_key, file_name in all_video_files.items():
-                if unique_id in file_key or file_key in unique_id:
-                    video_file = file_name
-                    break
+            file_key = find_partial_match(unique_id, partial_index)
+            if file_key is not None:
+                video_file = all_video_files[file_key]
         
         if video_file:
             video_path = os.path.join(video_dir, video_file)
@@ -302,6 +394,86 @@ def get_output_settings() -> Dict:
         'ffmpeg_args': quality_settings[choice]
     }
 
+def probe_stream_signature(video_file: str) -> Optional[Tuple]:
+    """Return the stream parameters that must match for a stream-copy concat.
+
+    Covers codec, resolution, pixel format, frame rate and time base of the
+    video stream and codec, sample rate and channel count of the audio
+    stream. Returns None if ffprobe fails. Results are cached by path, mtime
+    and size, so re-running a concatenation doesn't probe unchanged files.
+    """
+    try:
+        stat = os.stat(video_file)
+    except OSError:
+        return None
+    cache_key = (os.path.abspath(video_file), stat.st_mtime_ns, stat.st_size)
+    if cache_key in _stream_signature_cache:
+        return _stream_signature_cache[cache_key]
+
+    probe_cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries',
+        'stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,time_base,sample_rate,channels',
+        '-of', 'json',
+        video_file
+    ]
+    try:
+        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            return None
+        streams = json.loads(result.stdout).get('streams', [])
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return None
+
+    signature = tuple(sorted(
+        tuple(sorted((key, str(value)) for key, value in stream.items()))
+        for stream in streams
+        if stream.get('codec_type') in ('video', 'audio')
+    ))
+    _stream_signature_cache[cache_key] = signature
+    return signature
+
+def can_stream_copy(video_files: List[str]) -> bool:
+    """Check whether all videos share stream parameters, so concat can skip re-encoding."""
+    # ffprobe runs as a separate process, so threads are enough to probe
+    # several files at once
+    max_workers = min(len(video_files), os.cpu_count() or 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        signatures = list(executor.map(probe_stream_signature, video_files))
+
+    return bool(signatures[0]) and all(signature == signatures[0] for signature in signatures[1:])
+
+def run_ffmpeg(ffmpeg_cmd: List[str], timeout: int) -> Tuple[int, str]:
+    """Run FFmpeg and return (return code, last lines of stderr).
+
+    stderr is drained on a background thread into a bounded deque, so a long
+    encode neither keeps its whole progress log in memory nor blocks on a
+    full pipe. Raises subprocess.TimeoutExpired after killing FFmpeg.
+    """
+    process = subprocess.Popen(
+        ffmpeg_cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors='replace'
+    )
+    stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+    reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    reader.start()
+
+    try:
+        return_code = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        reader.join()
+        process.stderr.close()
+
+    return return_code, ''.join(stderr_tail)
+
 def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
     """Concatenate videos using FFmpeg."""
     if not video_files:
@@ -313,16 +485,30 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
     print(f"📹 Processing {len(video_files)} videos...")
     print(f"📁 Output: {output_settings['output_file']}")
     
+    temp_file_path = None
     try:
-        # Create temporary file list for FFmpeg
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as temp_file:
-            for video_file in video_files:
-                # Convert to absolute path and escape for FFmpeg
-                abs_path = os.path.abspath(video_file)
-                # Escape backslashes for Windows paths and single quotes
-                escaped_path = abs_path.replace('\\', '/').replace("'", "'\"'\"'")
-                temp_file.write(f"file '{escaped_path}'\n")
+        # Create temporary file list for FFmpeg, built in memory and written
+        # in one call. FFmpeg reads the list as UTF-8 whatever the locale
+        list_lines = []
+        for video_file in video_files:
+            # Convert to absolute path with forward slashes for Windows paths
+            abs_path = os.path.abspath(video_file).replace('\\', '/')
+            # Inside single quotes the concat demuxer needs ' written as '\''
+            escaped_path = abs_path.replace("'", "'\\''")
+            list_lines.append(f"file '{escaped_path}'\n")
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as temp_file:
             temp_file_path = temp_file.name
+            temp_file.write(''.join(list_lines).encode('utf-8'))
+        
+        # Inputs normalized by the batch processor share codec and format, so
+        # the concat demuxer can join them without decoding; anything mixed
+        # falls back to re-encoding with the selected quality settings.
+        if can_stream_copy(video_files):
+            print(f"⚡ All videos share the same format - joining without re-encoding")
+            codec_args = ['-c', 'copy']
+        else:
+            print(f"🔧 Videos differ in format - re-encoding while joining")
+            codec_args = output_settings['ffmpeg_args']
         
         # Build FFmpeg command
         ffmpeg_cmd = [
@@ -330,7 +516,7 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
             '-f', 'concat',
             '-safe', '0',
             '-i', temp_file_path,
-        ] + output_settings['ffmpeg_args'] + [
+        ] + codec_args + [
             '-y',  # Overwrite output file
             output_settings['output_file']
         ]
@@ -338,17 +524,9 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
         print(f"🔄 Running FFmpeg concatenation...")
         
         # Run FFmpeg
-        result = subprocess.run(
-            ffmpeg_cmd,
-            capture_output=True,
-            text=True,
-            timeout=3600  # 1 hour timeout
-        )
-        
-        # Clean up temp file
-        os.unlink(temp_file_path)
+        return_code, stderr_tail = run_ffmpeg(ffmpeg_cmd, timeout=3600)  # 1 hour timeout
         
-        if result.returncode == 0:
+        if return_code == 0:
             print(f"✅ Successfully created: {output_settings['output_file']}")
             
             # Show file size
@@ -359,8 +537,8 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
             
             return True
         else:
-            print(f"❌ FFmpeg failed with return code: {result.returncode}")
-            print(f"Error output: {result.stderr}")
+            print(f"❌ FFmpeg failed with return code: {return_code}")
+            print(f"Error output: {stderr_tail}")
             return False
             
     except subprocess.TimeoutExpired:
@@ -369,3 +547,7 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
     except Exception as e:
         print(f"❌ Error during concatenation: {e}")
         return False
+    finally:
+        # Remove the list file even if FFmpeg failed to start or timed out
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
@@ -4,7 +4,7 @@ Download videos from Google Drive and process them through FFmpeg.
 
 This script:
 1. Reads FileIDs from initial-video-data.csv
-2. Downloads videos from Google Drive using gdown
+2. Downloads videos from Google Drive over a pooled requests session
 3. Processes each video through FFmpeg standardization
 4. Saves processed videos with FileID-based names
 5. Cleans up temporary downloads
@@ -17,15 +17,15 @@ from batch_video_processor import BatchVideoProcessor
 import os
 
 
-def check_gdown_installation():
-    """Check if gdown is installed."""
+def check_requests_installation():
+    """Check if requests is installed."""
     try:
-        import gdown
-        print("✅ gdown is available")
+        import requests
+        print("✅ requests is available")
         return True
     except ImportError:
-        print("❌ gdown not installed")
-        print("   Install with: pip install gdown")
+        print("❌ requests not installed")
+        print("   Install with: pip install requests")
         return False
 
 
@@ -67,9 +67,9 @@ def main():
     print("=" * 50)
     
     # Check requirements
-    if not check_gdown_installation():
-        print("\n❌ Cannot proceed without gdown")
-        print("   Run: pip install gdown")
+    if not check_requests_installation():
+        print("\n❌ Cannot proceed without requests")
+        print("   Run: pip install requests")
         return
     
     if not os.path.exists(CSV_FILE):
@@ -236,6 +236,7 @@ def test_single_download():
     print("🧪 TESTING SINGLE VIDEO DOWNLOAD")
     print("=" * 40)
 
+    processor = None
     try:
         # Create processor with faster settings for testing
         processor = BatchVideoProcessor(
@@ -253,10 +254,6 @@ def test_single_download():
             batch_pause_max=2   # Shorter pauses for testing
         )
 
-        # Initialize persistent session for testing
-        print("🔗 Setting up persistent download session for testing...")
-        processor.initialize_gdown_session()
-
         # Try multiple videos until we find one that works
         import csv
         videos_checked = 0
@@ -321,6 +318,9 @@ def test_single_download():
 
     except Exception as e:
         print(f"❌ Test error: {e}")
+    finally:
+        if processor is not None:
+            processor.close()
 
 
 if __name__ == "__main__":
@@ -4,9 +4,14 @@ import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def convert_video_format(input_file, output_file, target_format="mp4", video_codec="libx264", audio_codec="aac",
-                        frame_width=1080, frame_height=1920, frame_rate=29.97, bitrate="6M"):
-    command = [
-        "ffmpeg", "-y", "-i", input_file,
+                        frame_width=1080, frame_height=1920, frame_rate=29.97, bitrate="6M",
+                        threads=None, hwaccel=None):
+    command = ["ffmpeg", "-y"]
+    if hwaccel:
+        # Decode on the GPU/media engine (e.g. "cuda", "qsv", "videotoolbox", "auto")
+        command += ["-hwaccel", hwaccel]
+    command += [
+        "-i", input_file,
         "-c:v", video_codec,
         "-c:a", audio_codec,
         "-vf", f"scale={frame_width}:{frame_height}",
@@ -14,8 +19,15 @@ def convert_video_format(input_file, output_file, target_format="mp4", video_cod
         "-b:v", bitrate,
         "-pix_fmt", "yuv420p",
         "-preset", "veryfast",
-        output_file
     ]
+    if threads:
+        # Cap encoder threads so parallel ffmpeg processes don't oversubscribe the CPU
+        command += ["-threads", str(threads)]
+    if not output_file.endswith(f".{target_format}"):
+        # FFmpeg picks the container from the extension; name it explicitly
+        # for outputs written under a temporary name (e.g. "clip.mp4.tmp")
+        command += ["-f", target_format]
+    command.append(output_file)
 
     try:
         subprocess.run(command, check=True, capture_output=True, text=True)
@@ -49,14 +49,21 @@ def generate_sequence_with_custom_mapping(
     try:
         print(f"📊 Loading clips from {csv_file}...")
 
-        # Load and filter clips based on category selections
+        # Load and filter clips based on category selections. The selected
+        # values become frozensets once so each row check is a hash lookup
+        filters = [(column_name, frozenset(allowed_values))
+                   for column_name, allowed_values in category_filters.items()]
+        unique_id_field = field_mapping['unique_id']
+        name_field = field_mapping['name']
+        category_field = field_mapping['category_1']
+
         clips = []
         with open(csv_file, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
                 # Check if this clip matches our category filters
                 matches = True
-                for column_name, allowed_values in category_filters.items():
+                for column_name, allowed_values in filters:
                     if column_name in row:
                         if row[column_name].strip() not in allowed_values:
                             matches = False
@@ -67,9 +74,9 @@ def generate_sequence_with_custom_mapping(
 
                 if matches:
                     clips.append({
-                        'unique_id': row[field_mapping['unique_id']].strip(),
-                        'name': row[field_mapping['name']].strip(),
-                        'category': row[field_mapping['category_1']].strip()
+                        'unique_id': row[unique_id_field].strip(),
+                        'name': row[name_field].strip(),
+                        'category': row[category_field].strip()
                     })
 
         print(f"✅ Found {len(clips)} clips matching your criteria")
@@ -107,14 +114,12 @@ def generate_sequence_with_custom_mapping(
             # Write header
             writer.writerow(['item_no', 'unique_id', 'name', 'category'])
 
-            # Write sequence
-            for i, clip in enumerate(sequence, 1):
-                writer.writerow([
-                    i,
-                    clip['unique_id'],
-                    clip['name'],
-                    clip['category']
-                ])
+            # Write sequence; writerows hands every row to the csv module's C
+            # writer in one call and keeps its quoting of commas and quotes
+            writer.writerows(
+                (i, clip['unique_id'], clip['name'], clip['category'])
+                for i, clip in enumerate(sequence, 1)
+            )
 
         print(f"✅ Successfully generated {len(sequence)} clip sequence!")
         return True
@@ -138,53 +143,111 @@ def generate_spaced_sequence(clips_by_category: Dict[str, List], target_length:
     if not clips_by_category:
         return []
 
-    # Create a pool of all clips
-    all_clips = []
+    # Shuffle each category's clips once. The search below only decides the
+    # order of categories and takes clips from these pools in turn. Categories
+    # are referred to by their index in pools, so the bookkeeping is plain
+    # lists indexed by small ints rather than dicts keyed by category name
+    pools = []
     for category_clips in clips_by_category.values():
-        all_clips.extend(category_clips)
-
-    if len(all_clips) < target_length:
-        target_length = len(all_clips)
-
-    # Simple approach: try multiple times to generate a valid sequence
-    for attempt in range(100):  # Try up to 100 times
-        sequence = []
-        available_clips = all_clips.copy()
-        random.shuffle(available_clips)
-
-        for _ in range(target_length):
-            # Find a clip that satisfies spacing constraint
-            for i, clip in enumerate(available_clips):
-                if can_place_clip(sequence, clip, min_spacing):
-                    sequence.append(clip)
-                    available_clips.pop(i)
-                    break
-            else:
-                # No valid clip found, try next attempt
-                break
+        if category_clips:
+            pool = list(category_clips)
+            random.shuffle(pool)
+            pools.append(pool)
+
+    total_clips = sum(len(pool) for pool in pools)
+    if total_clips < target_length:
+        target_length = total_clips
+
+    # Backtracking search: each position tries the eligible categories in a
+    # random order weighted by clips left, and a branch is abandoned as soon
+    # as the categories can no longer fill the remaining slots. Work is
+    # capped at roughly what the old 100 random restarts could cost.
+    used = [0] * len(pools)
+    last_placed_at = [None] * len(pools)  # category -> index of its latest clip
+    sequence = []
+    stack = []  # per position: [candidate categories, next candidate, placed category, its previous index]
+    steps_left = 100 * target_length
+
+    while len(sequence) < target_length and steps_left > 0:
+        position = len(sequence)
+
+        if len(stack) == position:
+            candidates = []
+            if can_fill_remaining(position, target_length, pools, used, last_placed_at, min_spacing):
+                candidates = [
+                    category for category, pool in enumerate(pools)
+                    if used[category] < len(pool)
+                    and can_place_clip(position, category, last_placed_at, min_spacing)
+                ]
+                candidates.sort(
+                    key=lambda category: random.random() ** (1.0 / (len(pools[category]) - used[category])),
+                    reverse=True
+                )
+            stack.append([candidates, 0, None, None])
+
+        frame = stack[-1]
+        if frame[1] < len(frame[0]):
+            # Place the next candidate category at this position
+            category = frame[0][frame[1]]
+            frame[1] += 1
+            frame[2], frame[3] = category, last_placed_at[category]
+            sequence.append(pools[category][used[category]])
+            used[category] += 1
+            last_placed_at[category] = position
+            steps_left -= 1
+            continue
+
+        # Every candidate failed here: undo the previous placement and let
+        # that position try its next candidate
+        stack.pop()
+        if not stack:
+            break
+        category, previous_position = stack[-1][2], stack[-1][3]
+        sequence.pop()
+        used[category] -= 1
+        last_placed_at[category] = previous_position
 
-        if len(sequence) == target_length:
-            return sequence
+    if len(sequence) == target_length:
+        return sequence
 
     # If we couldn't generate full sequence with spacing, generate without strict spacing
     print(f"⚠️  Could not maintain {min_spacing} spacing for all clips, using best effort...")
+    all_clips = [clip for pool in pools for clip in pool]
     random.shuffle(all_clips)
     return all_clips[:target_length]
 
-def can_place_clip(sequence: List[Dict], clip: Dict, min_spacing: int) -> bool:
-    """Check if a clip can be placed at the end of sequence with spacing constraint."""
-    if not sequence:
-        return True
+def can_place_clip(position: int, category: int, last_placed_at: List[Optional[int]], min_spacing: int) -> bool:
+    """Check if a clip of category can be placed at position with spacing constraint.
 
-    category = clip['category']
+    last_placed_at holds the index of each category's most recent clip (None
+    if not placed yet), so the check is a single lookup instead of a scan of
+    the sequence tail.
+    """
+    last_position = last_placed_at[category]
+    return last_position is None or position - last_position > min_spacing
 
-    # Check last min_spacing positions
-    check_positions = min(len(sequence), min_spacing)
-    for i in range(check_positions):
-        if sequence[-(i+1)]['category'] == category:
-            return False
+def can_fill_remaining(position: int, target_length: int, pools: List[List[Dict]], used: List[int],
+                       last_placed_at: List[Optional[int]], min_spacing: int) -> bool:
+    """Check that the clips left can still cover every slot from position on.
 
-    return True
+    Each category can fill at most one slot in every min_spacing + 1, starting
+    from the first slot its spacing allows, and no more slots than it has
+    clips left. If those upper bounds don't add up to the slots remaining,
+    no ordering of the clips left can complete the sequence.
+    """
+    slots_left = target_length - position
+    capacity = 0
+    for category, pool in enumerate(pools):
+        clips_left = len(pool) - used[category]
+        if not clips_left:
+            continue
+        last_position = last_placed_at[category]
+        first_slot = 0 if last_position is None else max(0, last_position + min_spacing + 1 - position)
+        if first_slot < slots_left:
+            capacity += min(clips_left, 1 + (slots_left - 1 - first_slot) // (min_spacing + 1))
+            if capacity >= slots_left:
+                return True
+    return capacity >= slots_left
 
 def analyze_csv_structure(csv_file: str) -> Tuple[List[str], List[Dict]]:
     """
@@ -356,24 +419,26 @@ def select_column(columns: List[str], required: bool = True, used_columns: set =
     if used_columns is None:
         used_columns = set()
 
-    while True:
-        print(f"\nAvailable columns:")
-        available_columns = []
-        for i, col in enumerate(columns, 1):
-            if col in used_columns:
-                print(f"   {i:2d}. {col} [ALREADY USED]")
-            else:
-                print(f"   {i:2d}. {col}")
-                available_columns.append((i, col))
+    # The menu only depends on the arguments, so render it once and keep
+    # retries after invalid input down to the error line and the prompt.
+    menu_lines = ["\nAvailable columns:"]
+    for i, col in enumerate(columns, 1):
+        if col in used_columns:
+            menu_lines.append(f"   {i:2d}. {col} [ALREADY USED]")
+        else:
+            menu_lines.append(f"   {i:2d}. {col}")
+
+    option_num = len(columns) + 1
+    if not required:
+        menu_lines.append(f"   {option_num:2d}. [Skip this field]")
+        option_num += 1
 
-        option_num = len(columns) + 1
-        if not required:
-            print(f"   {option_num:2d}. [Skip this field]")
-            option_num += 1
+    if allow_back:
+        menu_lines.append(f"   {option_num:2d}. [Go back to previous step]")
 
-        if allow_back:
-            print(f"   {option_num:2d}. [Go back to previous step]")
+    print("\n".join(menu_lines))
 
+    while True:
         try:
             choice = input(f"\nSelect column number (or type 'back'): ").strip().lower()
 
@@ -416,6 +481,15 @@ def select_column(columns: List[str], required: bool = True, used_columns: set =
                 return 'back'
             print("❌ Please enter a valid number or 'back'.")
 
+def _read_choice(prompt: str) -> Tuple[str, str]:
+    """Read a line of input, returning it stripped as typed and lowercased.
+
+    The lowercased form is for matching keywords such as 'back'; the raw
+    form keeps user-supplied values like filenames intact.
+    """
+    raw = input(prompt).strip()
+    return raw, raw.lower()
+
 def get_sequence_parameters() -> Dict:
     """Get sequence generation parameters from user with validation and back navigation."""
     print(f"\n⚙️  SEQUENCE PARAMETERS")
@@ -464,15 +538,15 @@ def get_sequence_parameters() -> Dict:
 
     # Get output file
     while True:
-        output_input = input("Output CSV filename? (default: generated_sequence.csv): ").strip().lower()
-        if output_input == 'back':
+        output_input, output_choice = _read_choice("Output CSV filename? (default: generated_sequence.csv): ")
+        if output_choice == 'back':
             return 'back'
         elif not output_input:
             params['output_file'] = "generated_sequence.csv"
             break
         else:
             # Validate filename
-            if not output_input.endswith('.csv'):
+            if not output_choice.endswith('.csv'):
                 output_input += '.csv'
             params['output_file'] = output_input
             break
@@ -521,11 +595,18 @@ def get_unique_values(csv_file: str, column_name: str) -> List[str]:
     """Get unique values from a specific column in CSV."""
     unique_values = set()
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if column_name in row and row[column_name].strip():
-                    unique_values.add(row[column_name].strip())
+        with open(csv_file, 'r', newline='', encoding='utf-8') as file:
+            # Only one column is needed, so index plain rows instead of
+            # building a dict for every row
+            reader = csv.reader(file)
+            header = next(reader, [])
+            if column_name in header:
+                column_index = header.index(column_name)
+                for row in reader:
+                    if column_index < len(row):
+                        value = row[column_index].strip()
+                        if value:
+                            unique_values.add(value)
     except Exception as e:
         print(f"❌ Error reading CSV: {e}")
 
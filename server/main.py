@@ -1,11 +1,13 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
 import os
 import subprocess
 import tempfile
 import random
+import shutil
 import string
 from pathlib import Path
 from typing import Optional, List, Dict, Any
@@ -37,6 +39,12 @@ UPLOAD_DIR = Path("uploads")
 OUTPUT_DIR = Path("outputs")
 TEMP_DIR = Path("temp")
 
+# Set once check_ffmpeg() has found a working FFmpeg
+ffmpeg_available = False
+
+# FFmpeg processes allowed to run at once within a batch request
+MAX_CONCURRENT_FFMPEG = max(1, (os.cpu_count() or 2) // 2)
+
 # Create directories if they don't exist
 for directory in [UPLOAD_DIR, OUTPUT_DIR, TEMP_DIR]:
     directory.mkdir(exist_ok=True)
@@ -45,10 +53,28 @@ def generate_random_string(length: int = 8) -> str:
     """Generate a random string for file naming."""
     return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
 
+async def save_upload(file: UploadFile, destination: Path):
+    """Copy an upload to disk in 1 MB chunks instead of reading it into memory whole."""
+    def copy():
+        with open(destination, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer, 1024 * 1024)
+
+    await run_in_threadpool(copy)
+
 def check_ffmpeg():
-    """Check if FFmpeg is available."""
+    """
+    Check if FFmpeg is available.
+
+    A successful probe is remembered for the life of the process, so requests
+    don't each spawn "ffmpeg -version"; a failed probe is retried next call
+    in case FFmpeg gets installed while the server is running.
+    """
+    global ffmpeg_available
+    if ffmpeg_available:
+        return True
     try:
         subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
+        ffmpeg_available = True
         return True
     except (subprocess.CalledProcessError, FileNotFoundError):
         return False
@@ -106,9 +132,7 @@ async def randomize_media(
     
     try:
         # Save uploaded file
-        with open(input_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        await save_upload(file, input_path)
         
         # Apply randomization effect based on type
         ffmpeg_cmd = build_ffmpeg_command(
@@ -118,8 +142,10 @@ async def randomize_media(
             intensity
         )
         
-        # Execute FFmpeg command
-        result = subprocess.run(
+        # Execute FFmpeg command on a worker thread; calling the blocking
+        # subprocess.run here directly would stall every other request
+        result = await run_in_threadpool(
+            subprocess.run,
             ffmpeg_cmd,
             capture_output=True,
             text=True,
@@ -150,8 +176,7 @@ async def randomize_media(
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
     finally:
         # Clean up input file
-        if input_path.exists():
-            input_path.unlink()
+        input_path.unlink(missing_ok=True)
 
 @app.post("/randomize-batch")
 async def randomize_batch(
@@ -174,10 +199,13 @@ async def randomize_batch(
     if len(files) > 10:  # Limit batch size
         raise HTTPException(status_code=400, detail="Maximum 10 files per batch")
 
-    results = []
     available_effects = ["basic", "glitch", "audio", "visual", "temporal", "psychedelic"]
 
-    for i, file in enumerate(files):
+    # FFmpeg runs for the batch's files overlap, capped so they don't oversubscribe the CPU
+    ffmpeg_slots = asyncio.Semaphore(MAX_CONCURRENT_FFMPEG)
+
+    async def process_file(i: int, file: UploadFile) -> Dict[str, Any]:
+        input_path = None
         try:
             # Generate unique filename
             random_id = generate_random_string()
@@ -189,9 +217,7 @@ async def randomize_batch(
             output_path = OUTPUT_DIR / output_filename
 
             # Save uploaded file
-            with open(input_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            await save_upload(file, input_path)
 
             # Determine effect for this file
             if same_effect:
@@ -209,31 +235,33 @@ async def randomize_batch(
                 current_intensity
             )
 
-            # Execute FFmpeg command
-            result = subprocess.run(
-                ffmpeg_cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout per file
-            )
+            # Execute FFmpeg command on a worker thread so other files can run alongside
+            async with ffmpeg_slots:
+                result = await run_in_threadpool(
+                    subprocess.run,
+                    ffmpeg_cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=300  # 5 minute timeout per file
+                )
 
             if result.returncode != 0:
                 logger.error(f"FFmpeg error for file {i}: {result.stderr}")
-                results.append({
+                return {
                     "file_index": i,
                     "original_filename": file.filename,
                     "status": "error",
                     "error": f"FFmpeg processing failed: {result.stderr[:200]}..."
-                })
+                }
             elif not output_path.exists():
-                results.append({
+                return {
                     "file_index": i,
                     "original_filename": file.filename,
                     "status": "error",
                     "error": "Output file was not created"
-                })
+                }
             else:
-                results.append({
+                return {
                     "file_index": i,
                     "original_filename": file.filename,
                     "status": "success",
@@ -241,27 +269,30 @@ async def randomize_batch(
                     "download_url": f"/download/{output_filename}",
                     "effect_applied": current_effect,
                     "intensity": current_intensity
-                })
-
-            # Clean up input file
-            if input_path.exists():
-                input_path.unlink()
+                }
 
         except subprocess.TimeoutExpired:
-            results.append({
+            return {
                 "file_index": i,
                 "original_filename": file.filename,
                 "status": "error",
                 "error": "Processing timeout"
-            })
+            }
         except Exception as e:
             logger.error(f"Error processing batch file {i}: {str(e)}")
-            results.append({
+            return {
                 "file_index": i,
                 "original_filename": file.filename,
                 "status": "error",
                 "error": f"Processing error: {str(e)}"
-            })
+            }
+        finally:
+            # Clean up input file
+            if input_path is not None:
+                input_path.unlink(missing_ok=True)
+
+    # gather() keeps results in upload order
+    results = await asyncio.gather(*(process_file(i, file) for i, file in enumerate(files)))
 
     # Summary statistics
     successful = len([r for r in results if r["status"] == "success"])
@@ -371,14 +402,17 @@ async def download_file(filename: str):
     """Download a processed file."""
     file_path = OUTPUT_DIR / filename
     
-    if not file_path.exists():
+    # One stat() both checks for the file and gets its size
+    try:
+        file_size = file_path.stat().st_size
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
     
     # In a real implementation, you'd want to serve the file properly
     # For now, return file info
     return {
         "filename": filename,
-        "size": file_path.stat().st_size,
+        "size": file_size,
         "path": str(file_path.absolute()),
         "message": "File ready for download"
     }
@@ -13,12 +13,27 @@ Date: 2025-01-06
 """
 
 import csv
+import json
 import os
 import subprocess
 import tempfile
-from pathlib import Path
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 
+# File extensions treated as videos when scanning a directory
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'})
+
+# Lines of FFmpeg stderr kept for error reports
+FFMPEG_STDERR_TAIL_LINES = 200
+
+# Video files per directory keyed by (path, directory mtime): {stem: filename}
+_video_index_cache: Dict[Tuple[str, int], Dict[str, str]] = {}
+
+# Stream signatures from ffprobe keyed by (path, mtime, size)
+_stream_signature_cache: Dict[Tuple[str, int, int], Tuple] = {}
+
 def get_video_location() -> str:
     """Ask user for video directory and validate it exists."""
     while True:
@@ -39,11 +54,7 @@ def get_video_location() -> str:
             continue
             
         # Check if directory has video files
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
-        video_files = []
-        for file in os.listdir(video_dir):
-            if Path(file).suffix.lower() in video_extensions:
-                video_files.append(file)
+        video_files = list(scan_video_directory(video_dir).values())
         
         if not video_files:
             print(f"⚠️  No video files found in '{video_dir}'")
@@ -116,6 +127,112 @@ def load_sequence_list(csv_file: str) -> List[Dict]:
         print(f"❌ Error loading sequence: {e}")
         return []
 
+def scan_video_directory(video_dir: str) -> Dict[str, str]:
+    """
+    Index the video files in a directory by filename without extension.
+    
+    Uses a single os.scandir pass; DirEntry caches the file type, so
+    skipping subdirectories costs no extra stat calls. The index is cached
+    until the directory's mtime changes, so validating the directory and
+    then matching the sequence share one scan.
+    
+    Returns:
+        Dict mapping filename stem to filename
+    """
+    cache_key = (os.path.abspath(video_dir), os.stat(video_dir).st_mtime_ns)
+    if cache_key in _video_index_cache:
+        return _video_index_cache[cache_key]
+    
+    video_index = {}
+    with os.scandir(video_dir) as entries:
+        for entry in entries:
+            name_key, extension = os.path.splitext(entry.name)
+            if extension.lower() in VIDEO_EXTENSIONS and entry.is_file():
+                video_index[name_key] = entry.name
+    _video_index_cache[cache_key] = video_index
+    return video_index
+
+def build_partial_match_index(file_keys: List[str]) -> Dict:
+    """
+    Index filename stems for substring matching in either direction.
+    
+    Args:
+        file_keys: Filename stems in directory order
+        
+    Returns:
+        Index for find_partial_match()
+    """
+    trigram_index = defaultdict(list)
+    head_index = defaultdict(list)
+    short_keys = []
+    for i, file_key in enumerate(file_keys):
+        if len(file_key) < 3:
+            short_keys.append(i)
+            continue
+        head_index[file_key[:3]].append(i)
+        for trigram in {file_key[j:j + 3] for j in range(len(file_key) - 2)}:
+            trigram_index[trigram].append(i)
+    
+    return {
+        'keys': file_keys,
+        'trigrams': trigram_index,
+        'heads': head_index,
+        'short': short_keys,
+    }
+
+def find_partial_match(text: str, partial_index: Dict) -> Optional[str]:
+    """
+    Return the first stem that contains text or is contained in it.
+    
+    Gives the same answer as testing every stem in directory order, but only
+    runs the substring test on stems that share a trigram with text.
+    
+    Args:
+        text: Sequence name or unique ID
+        partial_index: Index from build_partial_match_index()
+        
+    Returns:
+        Matching filename stem, or None
+    """
+    file_keys = partial_index['keys']
+    best = None
+    
+    # A stem inside text starts with one of text's trigrams (or is shorter
+    # than a trigram), so only stems filed under those heads can match
+    heads = partial_index['heads']
+    postings_lists = [partial_index['short']]
+    postings_lists.extend(heads[trigram] for trigram in {text[j:j + 3] for j in range(len(text) - 2)}
+                          if trigram in heads)
+    for postings in postings_lists:
+        for i in postings:
+            if best is not None and i >= best:
+                break
+            if file_keys[i] in text:
+                best = i
+                break
+    
+    # Stems containing text must contain every trigram of it, so the rarest
+    # trigram's (ordered) posting list bounds the candidates
+    if len(text) < 3:
+        candidates = range(len(file_keys))
+    else:
+        candidates = None
+        for j in range(len(text) - 2):
+            postings = partial_index['trigrams'].get(text[j:j + 3])
+            if not postings:
+                candidates = []
+                break
+            if candidates is None or len(postings) < len(candidates):
+                candidates = postings
+    for i in candidates:
+        if best is not None and i >= best:
+            break
+        if text in file_keys[i]:
+            best = i
+            break
+    
+    return file_keys[best] if best is not None else None
+
 def find_video_files(video_dir: str, sequence: List[Dict]) -> Tuple[List[str], List[Dict]]:
     """
     Find video files matching the sequence list.
@@ -126,20 +243,17 @@ def find_video_files(video_dir: str, sequence: List[Dict]) -> Tuple[List[str], L
     print(f"\n🔍 FINDING VIDEO FILES")
     print("-" * 30)
     
-    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
     found_videos = []
     missing_items = []
     
     # Get all video files in directory
-    all_video_files = {}
-    for file in os.listdir(video_dir):
-        if Path(file).suffix.lower() in video_extensions:
-            # Use filename without extension as key
-            name_key = Path(file).stem
-            all_video_files[name_key] = file
+    all_video_files = scan_video_directory(video_dir)
     
     print(f"📁 Found {len(all_video_files)} video files in directory")
     
+    # Built once so partial matches don't scan every file for every item
+    partial_index = build_partial_match_index(list(all_video_files))
+    
     # Match sequence items to video files
     for item in sequence:
         name = item['name']
@@ -158,17 +272,15 @@ def find_video_files(video_dir: str, sequence: List[Dict]) -> Tuple[List[str], L
         
         # Strategy 3: Partial name match
         else:
-            for file_key, file_name in all_video_files.items():
-                if name in file_key or file_key in name:
-                    video_file = file_name
-                    break
+            file_key = find_partial_match(name, partial_index)
+            if file_key is not None:
+                video_file = all_video_files[file_key]
         
         # Strategy 4: Partial unique_id match
         if not video_file:
-            for file_key, file_name in all_video_files.items():
-                if unique_id in file_key or file_key in unique_id:
-                    video_file = file_name
-                    break
+            file_key = find_partial_match(unique_id, partial_index)
+            if file_key is not None:
+                video_file = all_video_files[file_key]
         
         if video_file:
             video_path = os.path.join(video_dir, video_file)
@@ -228,6 +340,108 @@ def get_output_settings() -> Dict:
         'ffmpeg_args': quality_settings[choice]
     }
 
+def probe_stream_signature(video_file: str) -> Optional[Tuple]:
+    """
+    Return the stream parameters that must match for a stream-copy concat.
+    
+    Covers codec, resolution, pixel format, frame rate and time base of the
+    video stream and codec, sample rate and channel count of the audio
+    stream. Results are cached by path, mtime and size.
+    
+    Returns:
+        Hashable signature of the streams, or None if ffprobe fails
+    """
+    try:
+        stat = os.stat(video_file)
+    except OSError:
+        return None
+    cache_key = (os.path.abspath(video_file), stat.st_mtime_ns, stat.st_size)
+    if cache_key in _stream_signature_cache:
+        return _stream_signature_cache[cache_key]
+    
+    probe_cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries',
+        'stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,time_base,sample_rate,channels',
+        '-of', 'json',
+        video_file
+    ]
+    try:
+        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            return None
+        streams = json.loads(result.stdout).get('streams', [])
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return None
+    
+    signature = tuple(sorted(
+        tuple(sorted((key, str(value)) for key, value in stream.items()))
+        for stream in streams
+        if stream.get('codec_type') in ('video', 'audio')
+    ))
+    _stream_signature_cache[cache_key] = signature
+    return signature
+
+def can_stream_copy(video_files: List[str]) -> bool:
+    """
+    Check whether all videos share stream parameters, so concat can skip re-encoding.
+    
+    Args:
+        video_files: List of video file paths
+        
+    Returns:
+        True if every video was probed and all signatures match
+    """
+    # ffprobe runs as a separate process, so threads are enough to probe
+    # several files at once
+    max_workers = min(len(video_files), os.cpu_count() or 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        signatures = list(executor.map(probe_stream_signature, video_files))
+    
+    return bool(signatures[0]) and all(signature == signatures[0] for signature in signatures[1:])
+
+def run_ffmpeg(ffmpeg_cmd: List[str], timeout: int) -> Tuple[int, str]:
+    """
+    Run FFmpeg, keeping only the tail of its stderr.
+    
+    stderr is drained on a background thread into a bounded deque, so a
+    long encode neither accumulates its whole progress log in memory nor
+    blocks on a full pipe.
+    
+    Args:
+        ffmpeg_cmd: Full FFmpeg command line
+        timeout: Seconds to wait before killing FFmpeg
+        
+    Returns:
+        Tuple of (return_code, last lines of stderr)
+        
+    Raises:
+        subprocess.TimeoutExpired: If FFmpeg runs longer than timeout
+    """
+    process = subprocess.Popen(
+        ffmpeg_cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors='replace'
+    )
+    stderr_tail = deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+    reader = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+    reader.start()
+    
+    try:
+        return_code = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        reader.join()
+        process.stderr.close()
+    
+    return return_code, ''.join(stderr_tail)
+
 def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
     """
     Concatenate videos using FFmpeg.
@@ -248,16 +462,30 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
     print(f"📹 Processing {len(video_files)} videos...")
     print(f"📁 Output: {output_settings['output_file']}")
     
+    temp_file_path = None
     try:
-        # Create temporary file list for FFmpeg
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as temp_file:
-            for video_file in video_files:
-                # Convert to absolute path and escape for FFmpeg
-                abs_path = os.path.abspath(video_file)
-                # Escape backslashes for Windows paths and single quotes
-                escaped_path = abs_path.replace('\\', '/').replace("'", "'\"'\"'")
-                temp_file.write(f"file '{escaped_path}'\n")
+        # Create temporary file list for FFmpeg, built in memory and written
+        # in one call. FFmpeg reads the list as UTF-8 whatever the locale
+        list_lines = []
+        for video_file in video_files:
+            # Convert to absolute path with forward slashes for Windows paths
+            abs_path = os.path.abspath(video_file).replace('\\', '/')
+            # Inside single quotes the concat demuxer needs ' written as '\''
+            escaped_path = abs_path.replace("'", "'\\''")
+            list_lines.append(f"file '{escaped_path}'\n")
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as temp_file:
             temp_file_path = temp_file.name
+            temp_file.write(''.join(list_lines).encode('utf-8'))
+        
+        # Clips that share codec and format can be joined by the concat
+        # demuxer without decoding; anything mixed is re-encoded with the
+        # selected quality preset
+        if can_stream_copy(video_files):
+            print(f"⚡ All videos share the same format - joining without re-encoding")
+            codec_args = ['-c', 'copy']
+        else:
+            print(f"🔧 Videos differ in format - re-encoding while joining")
+            codec_args = output_settings['ffmpeg_args']
         
         # Build FFmpeg command
         ffmpeg_cmd = [
@@ -265,7 +493,7 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
             '-f', 'concat',
             '-safe', '0',
             '-i', temp_file_path,
-        ] + output_settings['ffmpeg_args'] + [
+        ] + codec_args + [
             '-y',  # Overwrite output file
             output_settings['output_file']
         ]
@@ -274,17 +502,9 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
         print(f"   Command: {' '.join(ffmpeg_cmd[:8])}... [truncated]")
         
         # Run FFmpeg
-        result = subprocess.run(
-            ffmpeg_cmd,
-            capture_output=True,
-            text=True,
-            timeout=3600  # 1 hour timeout
-        )
-        
-        # Clean up temp file
-        os.unlink(temp_file_path)
+        return_code, stderr_tail = run_ffmpeg(ffmpeg_cmd, timeout=3600)  # 1 hour timeout
         
-        if result.returncode == 0:
+        if return_code == 0:
             print(f"✅ Successfully created: {output_settings['output_file']}")
             
             # Show file size
@@ -295,8 +515,8 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
             
             return True
         else:
-            print(f"❌ FFmpeg failed with return code: {result.returncode}")
-            print(f"Error output: {result.stderr}")
+            print(f"❌ FFmpeg failed with return code: {return_code}")
+            print(f"Error output: {stderr_tail}")
             return False
             
     except subprocess.TimeoutExpired:
@@ -305,6 +525,10 @@ def concatenate_videos(video_files: List[str], output_settings: Dict) -> bool:
     except Exception as e:
         print(f"❌ Error during concatenation: {e}")
         return False
+    finally:
+        # Remove the list file even if FFmpeg failed to start or timed out
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
 
 def main():
     print("🎬 INTERACTIVE VIDEO CONCATENATOR")